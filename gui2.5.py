@@ -1,20 +1,36 @@
 import sys
 import os
+import time
 import uuid
 import yaml
 import shlex
 import shutil
+import re
+import json
+import math
+import heapq
+import bisect
 import hashlib
+import csv
+import sqlite3
 import subprocess
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidgetItem,
+import threading
+import multiprocessing
+from array import array
+from collections import OrderedDict, namedtuple
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QTableView,
                              QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QPlainTextEdit,
                              QMessageBox, QLineEdit, QSplitter, QMenu, QCheckBox, QLabel,
                              QInputDialog, QHeaderView, QFileDialog, QDialog, QListWidget,
                              QFrame, QScrollArea, QListWidgetItem, QDialogButtonBox, QAbstractItemView, QTextEdit,
-                             QProgressDialog)
+                             QProgressDialog, QDockWidget, QShortcut, QTreeWidget, QTreeWidgetItem, QComboBox,
+                             QCompleter, QStyledItemDelegate, QStyleOptionViewItem, QStyle, QTreeView,
+                             QToolTip)
 from PyQt5.QtGui import (QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QPainter,
-                         QFontMetrics, QPalette, QTextFormat, QTextCursor)
-from PyQt5.QtCore import Qt, QRegExp, QSize, QRect, QPoint, QThread, pyqtSignal
+                         QFontMetrics, QPalette, QTextFormat, QTextCursor, QKeySequence, QBrush)
+from PyQt5.QtCore import (Qt, QRegularExpression, QSize, QRect, QPoint, QLine, QThread, QEvent,
+                          QStringListModel, QAbstractTableModel, QAbstractItemModel, QModelIndex,
+                          QItemSelectionModel, QTimer, pyqtSignal)
 
 
 class LineNumberArea(QWidget):
@@ -30,115 +46,136 @@ class LineNumberArea(QWidget):
 
 
 class NucleiPOCHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.highlightingRules = []
-
-        # 定义颜色常量，方便主题切换
-        BLUE = "#1E90FF"  # 关键字颜色
-        GREEN = "#32CD32"  # 值颜色
-        RED = "#B22222"  # 注释颜色
-        ORANGE = "#FFA500"  # 特殊关键字颜色
-        PURPLE = "#9400D3"  # 匹配器颜色
-
-        # 关键字格式（蓝色加粗）
-        keyFormat = QTextCharFormat()
-        keyFormat.setForeground(QColor(BLUE))
-        keyFormat.setFontWeight(QFont.Bold)
-
-        # 特殊关键字格式（橙色加粗）
-        specialKeyFormat = QTextCharFormat()
-        specialKeyFormat.setForeground(QColor(ORANGE))
-        specialKeyFormat.setFontWeight(QFont.Bold)
-
-        # 值格式（绿色）
-        valueFormat = QTextCharFormat()
-        valueFormat.setForeground(QColor(GREEN))
-
-        # 注释格式（红色）
-        commentFormat = QTextCharFormat()
-        commentFormat.setForeground(QColor(RED))
-        # 修正：使用 setFontItalic()
-        commentFormat.setFontItalic(True)
-
-        # 匹配器格式（紫色）
-        matcherFormat = QTextCharFormat()
-        matcherFormat.setForeground(QColor(PURPLE))
-        matcherFormat.setFontWeight(QFont.Bold)
-
-        # Nuclei POC 关键字
-        keywords = [
-            # 基本信息
-            'id', 'info', 'name', 'author', 'severity', 'tags',
-            'description', 'reference', 'classification',
-
-            # 请求相关
-            'requests', 'method', 'path', 'headers', 'body',
-            'max-request', 'timeout', 'attack-type',
-
-            # HTTP 方法
-            'GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS', 'PATCH',
-
-            # 匹配器类型
-            'matchers', 'type', 'condition', 'part',
-
-            # 匹配器子类型
-            'status', 'regex', 'word', 'binary', 'size', 'dsl',
-
-            # 提取器
-            'extractors', 'kind', 'regex', 'json', 'xpath'
-        ]
+    """Nuclei POC 语法高亮：全部关键字合并为一个带命名分组的正则，每行只扫描一遍
 
-        # 特殊关键字
-        specialKeywords = [
-            'true', 'false', 'null',
-            'critical', 'high', 'medium', 'low', 'info'
-        ]
+    正则与格式在类级别编译一次，所有编辑器共享。着色优先级与逐条规则叠加时相同：
+    键名 < 特殊/匹配器关键字 < 值（第一个冒号到行尾）< 注释（第一个 # 到行尾）< URL。
+    """
 
-        # 匹配器关键字
-        matcherKeywords = [
-            'and', 'or', 'not',
-            'contains', 'equals', 'matches'
-        ]
+    # 定义颜色常量，方便主题切换
+    BLUE = "#1E90FF"  # 关键字颜色
+    GREEN = "#32CD32"  # 值颜色
+    RED = "#B22222"  # 注释颜色
+    ORANGE = "#FFA500"  # 特殊关键字颜色
+    PURPLE = "#9400D3"  # 匹配器颜色
+    URL_COLOR = "#4169E1"  # URL 颜色
+
+    # Nuclei POC 关键字（后面跟冒号时高亮）
+    KEYWORDS = [
+        # 基本信息
+        'id', 'info', 'name', 'author', 'severity', 'tags',
+        'description', 'reference', 'classification',
+
+        # 请求相关
+        'requests', 'method', 'path', 'headers', 'body',
+        'max-request', 'timeout', 'attack-type',
 
-        # 添加普通关键字高亮规则
-        for keyword in keywords:
-            pattern = QRegExp(f"\\b{keyword}\\b(?=\\s*:)")
-            self.highlightingRules.append((pattern, keyFormat))
+        # HTTP 方法
+        'GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS', 'PATCH',
 
-        # 添加特殊关键字高亮规则
-        for keyword in specialKeywords:
-            pattern = QRegExp(f"\\b{keyword}\\b")
-            self.highlightingRules.append((pattern, specialKeyFormat))
+        # 匹配器类型
+        'matchers', 'type', 'condition', 'part',
 
-        # 添加匹配器关键字高亮规则
-        for keyword in matcherKeywords:
-            pattern = QRegExp(f"\\b{keyword}\\b")
-            self.highlightingRules.append((pattern, matcherFormat))
+        # 匹配器子类型
+        'status', 'regex', 'word', 'binary', 'size', 'dsl',
 
-        # 值高亮（从冒号开始到行尾）
-        valuePattern = QRegExp(":\\s*.*$")
-        self.highlightingRules.append((valuePattern, valueFormat))
+        # 提取器
+        'extractors', 'kind', 'json', 'xpath'
+    ]
 
-        # 注释高亮
-        commentPattern = QRegExp("#.*$")
-        self.highlightingRules.append((commentPattern, commentFormat))
+    # 特殊关键字
+    SPECIAL_KEYWORDS = [
+        'true', 'false', 'null',
+        'critical', 'high', 'medium', 'low', 'info'
+    ]
 
-        # URL 高亮
-        urlFormat = QTextCharFormat()
-        urlFormat.setForeground(QColor("#4169E1"))
-        urlFormat.setFontUnderline(True)
-        urlPattern = QRegExp("https?://\\S+")
-        self.highlightingRules.append((urlPattern, urlFormat))
+    # 匹配器关键字
+    MATCHER_KEYWORDS = [
+        'and', 'or', 'not',
+        'contains', 'equals', 'matches'
+    ]
+
+    # 合并正则中的分组，按优先级排列（info 既是键名也是特殊关键字，按特殊关键字着色）
+    GROUPS = ('url', 'special', 'matcher', 'key')
+
+    rules = None  # (合并正则, {分组名或 value/comment: 格式})，首次创建高亮器时编译
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        if NucleiPOCHighlighter.rules is None:
+            NucleiPOCHighlighter.rules = self.compileRules()
+        self.pattern, self.formats = NucleiPOCHighlighter.rules
+        self.max_line_length = None  # 每行最多高亮的字符数，大文件模式下设置，超出部分不着色
+
+    @classmethod
+    def compileRules(cls):
+        def charFormat(color, bold=False, italic=False, underline=False):
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            if bold:
+                fmt.setFontWeight(QFont.Bold)
+            fmt.setFontItalic(italic)
+            fmt.setFontUnderline(underline)
+            return fmt
+
+        def words(keywords):
+            return '|'.join(re.escape(keyword) for keyword in keywords)
+
+        formats = {
+            'key': charFormat(cls.BLUE, bold=True),  # 关键字格式（蓝色加粗）
+            'special': charFormat(cls.ORANGE, bold=True),  # 特殊关键字格式（橙色加粗）
+            'matcher': charFormat(cls.PURPLE, bold=True),  # 匹配器格式（紫色）
+            'value': charFormat(cls.GREEN),  # 值格式（绿色）
+            'comment': charFormat(cls.RED, italic=True),  # 注释格式（红色斜体）
+            'url': charFormat(cls.URL_COLOR, underline=True),  # URL 格式（下划线）
+        }
+        pattern = QRegularExpression(
+            "(?<url>https?://\\S+)"
+            f"|(?<special>\\b(?:{words(cls.SPECIAL_KEYWORDS)})\\b)"
+            f"|(?<matcher>\\b(?:{words(cls.MATCHER_KEYWORDS)})\\b)"
+            f"|(?<key>\\b(?:{words(cls.KEYWORDS)})\\b(?=\\s*:))")
+        pattern.optimize()
+        return pattern, formats
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            expression = QRegExp(pattern)
-            index = expression.indexIn(text)
-            while index >= 0:
-                length = expression.matchedLength()
-                self.setFormat(index, length, format)
-                index = expression.indexIn(text, index + length)
+        formats = self.formats
+        if self.max_line_length is not None and len(text) > self.max_line_length:
+            text = text[:self.max_line_length]
+        # 值从第一个冒号开始、注释从第一个 # 开始，都到行尾为止，其中的关键字不再单独着色
+        value_start = text.find(':')
+        comment_start = text.find('#')
+        length = len(text)
+        if not text.isascii():
+            # setFormat 与 QRegularExpression 使用 UTF-16 下标
+            length = len(text.encode('utf-16-le')) // 2
+            if value_start > 0:
+                value_start = len(text[:value_start].encode('utf-16-le')) // 2
+            if comment_start > 0:
+                comment_start = len(text[:comment_start].encode('utf-16-le')) // 2
+        plain_end = min(position for position in (value_start, comment_start, length) if position >= 0)
+        has_url = '://' in text
+
+        urls = []
+        iterator = self.pattern.globalMatch(text)
+        while iterator.hasNext():
+            match = iterator.next()
+            start = match.capturedStart()
+            if start >= plain_end and not has_url:
+                break
+            for group in self.GROUPS:
+                if match.capturedStart(group) >= 0:
+                    break
+            if group == 'url':
+                urls.append((start, match.capturedLength()))
+            elif start < plain_end:
+                self.setFormat(start, match.capturedLength(), formats[group])
+
+        if value_start >= 0:
+            self.setFormat(value_start, length - value_start, formats['value'])
+        if comment_start >= 0:
+            self.setFormat(comment_start, length - comment_start, formats['comment'])
+        for start, count in urls:
+            self.setFormat(start, count, formats['url'])
         self.setCurrentBlockState(0)
 
 
@@ -153,8 +190,16 @@ class YamlTextEdit(QPlainTextEdit):
         # 创建行号区域
         self.line_number_area = LineNumberArea(self)
 
+        # 块号 -> 缩进字符数（空白行为 0），绘制缩进线时按需计算，文档内容变化时失效
+        self.indent_cache = []
+        self.indent_guide_limit = None  # 超过该长度的行不画缩进线（大文件模式）
+        self.issues = []  # 模板校验发现的问题 [TemplateIssue]
+        self.issue_selections = []  # 问题位置的波浪下划线
+        self.indent_block_count = self.document().blockCount()
+
         # 连接信号和槽
         self.blockCountChanged.connect(self.update_line_number_area_width)
+        self.document().contentsChange.connect(self.invalidate_indent_cache)
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self.highlight_current_line)
 
@@ -202,38 +247,31 @@ class YamlTextEdit(QPlainTextEdit):
         background_color = QColor(39, 40, 34)  # Monokai 主题的背景色
         painter.fillRect(event.rect(), background_color)
 
+        # 设置字体颜色为红色
+        painter.setPen(QColor(255, 0, 0))  # 鲜艳的红色
+        width = self.line_number_area.width() - 3
+
+        # 只绘制与重绘区域相交的行，超出区域底部即停止
+        rect = event.rect()
         block = self.firstVisibleBlock()
         block_number = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        height = self.blockBoundingRect(block).height()
 
-        while block.isValid():
+        while block.isValid() and top <= rect.bottom():
             if not block.isVisible():
                 block = block.next()
                 block_number += 1
                 continue
 
-            # 绘制行号
-            number = str(block_number + 1)
-
-            # 设置字体颜色为红色
-            painter.setPen(QColor(255, 0, 0))  # 鲜艳的红色
-
-            painter.drawText(
-                QRect(
-                    0,
-                    int(top),
-                    self.line_number_area.width() - 3,
-                    int(height)
-                ),
-                Qt.AlignRight | Qt.AlignVCenter,
-                number
-            )
+            height = self.blockBoundingRect(block).height()
+            if top + height >= rect.top():
+                # 绘制行号
+                painter.drawText(QRect(0, int(top), width, int(height)),
+                                 Qt.AlignRight | Qt.AlignVCenter, str(block_number + 1))
 
             block = block.next()
             top += height
             block_number += 1
-            height = self.blockBoundingRect(block).height()
 
     def highlight_current_line(self):
         """高亮当前行"""
@@ -263,7 +301,37 @@ class YamlTextEdit(QPlainTextEdit):
 
             extra_selections.append(cursor_selection)
 
-        self.setExtraSelections(extra_selections)
+        self.setExtraSelections(extra_selections + self.issue_selections)
+
+    def set_issues(self, issues):
+        """用红色波浪线标出校验问题：从问题所在列到行尾，位于行尾时标出整行"""
+        self.issues = issues
+        self.issue_selections = []
+        document = self.document()
+        for issue in issues:
+            block = document.findBlockByNumber(min(issue.line, document.blockCount() - 1))
+            column = issue.column if issue.column < len(block.text().rstrip()) else 0
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+            selection.format.setUnderlineColor(QColor(255, 60, 60) if issue.fatal else QColor(255, 170, 0))
+            selection.format.setToolTip(issue.message)
+            selection.cursor = QTextCursor(block)
+            selection.cursor.setPosition(block.position() + column)
+            selection.cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            self.issue_selections.append(selection)
+        self.highlight_current_line()
+
+    def viewportEvent(self, event):
+        """鼠标停在有问题的行上时显示问题说明"""
+        if event.type() == QEvent.ToolTip and self.issues:
+            line = self.cursorForPosition(event.pos()).blockNumber()
+            messages = [issue.message for issue in self.issues if issue.line == line]
+            if messages:
+                QToolTip.showText(event.globalPos(), '\n'.join(messages), self.viewport())
+            else:
+                QToolTip.hideText()
+            return True
+        return super().viewportEvent(event)
 
     def keyPressEvent(self, event):
         """处理按键事件"""
@@ -277,6 +345,38 @@ class YamlTextEdit(QPlainTextEdit):
         """获取缩进级别"""
         return len(text) - len(text.lstrip())
 
+    def block_indent(self, block):
+        """块的缩进字符数，空白行为 0；按块号缓存"""
+        number = block.blockNumber()
+        cache = self.indent_cache
+        if number >= len(cache):
+            cache.extend([None] * (number + 1 - len(cache)))
+        indent = cache[number]
+        if indent is None:
+            if self.indent_guide_limit is not None and block.length() > self.indent_guide_limit:
+                indent = 0  # 超长行不取整行文本
+            else:
+                text = block.text()
+                indent = self.get_indent_level(text) if text.strip() else 0
+            cache[number] = indent
+        return indent
+
+    def invalidate_indent_cache(self, position, removed, added):
+        """文档内容变化：行数不变时只失效被修改的块，否则其后的块号都已改变，从变化处截断"""
+        document = self.document()
+        first = document.findBlock(position).blockNumber()
+        if first < 0:
+            first = 0
+        if document.blockCount() == self.indent_block_count:
+            last = document.findBlock(position + added).blockNumber()
+            if last < 0:
+                last = document.blockCount() - 1
+            for number in range(first, min(last + 1, len(self.indent_cache))):
+                self.indent_cache[number] = None
+        else:
+            del self.indent_cache[first:]
+        self.indent_block_count = document.blockCount()
+
     def paintEvent(self, event):
         super().paintEvent(event)
 
@@ -289,30 +389,29 @@ class YamlTextEdit(QPlainTextEdit):
         highlight_color = QColor(255, 255, 255, 100)  # 白色，较高透明度
         painter.fillRect(cursor_rect, highlight_color)
 
-        # 绘制垂直缩进线的代码保持不变
+        # 绘制垂直缩进线：只遍历与重绘区域相交的块，收集后一次性绘制
         font_metrics = self.fontMetrics()
         space_width = font_metrics.horizontalAdvance(' ')
         line_height = font_metrics.height()
 
+        rect = event.rect()
         block = self.firstVisibleBlock()
-        while block.isValid():
-            text = block.text()
-            if text.strip():
-                # 计算缩进
-                indent = len(text) - len(text.lstrip())
-                if indent > 0:
-                    x = indent * space_width
-                    top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-
-                    # 绘制垂直缩进线
-                    painter.setPen(QColor(200, 200, 200, 100))  # 半透明灰色
-                    painter.drawLine(
-                        int(x), int(top),
-                        int(x), int(top + line_height)
-                    )
-
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        lines = []
+        while block.isValid() and top <= rect.bottom():
+            if block.isVisible():
+                height = self.blockBoundingRect(block).height()
+                indent = self.block_indent(block)
+                if indent > 0 and top + height >= rect.top():
+                    x = int(indent * space_width)
+                    lines.append(QLine(x, int(top), x, int(top + line_height)))
+                top += height
             block = block.next()
 
+        if lines:
+            painter.setPen(QColor(200, 200, 200, 100))  # 半透明灰色
+            painter.drawLines(lines)
+
 
 class FolderHistoryDialog(QDialog):
     def __init__(self, history, parent=None):
@@ -458,8 +557,26 @@ class FolderHistoryDialog(QDialog):
 
 
 class EditorWidget(QWidget):
+    similarRequested = pyqtSignal(str)  # 请求查找与编辑器内容相似的模板
+    loadFinished = pyqtSignal()  # 大文件分块加载完成
+    issuesChanged = pyqtSignal(list)  # 实时校验完成，[TemplateIssue]
+
+    # 大文件模式：内容超过 LARGE_FILE_SIZE 个字符或存在超过 LONG_LINE_LENGTH 的行时启用，
+    # 分块载入编辑器，每行只高亮前 HIGHLIGHT_LINE_LIMIT 个字符，超长行不画缩进线
+    LARGE_FILE_SIZE = 512 * 1024
+    LONG_LINE_LENGTH = 5000
+    HIGHLIGHT_LINE_LIMIT = 2000
+    LOAD_CHUNK_SIZE = 128 * 1024  # 每次事件循环追加的字符数（在换行处截断）
+    VALIDATE_DELAY_MS = 500  # 停止输入多久后开始校验
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.large_file = False
+        self.pending_content = None  # 分块加载中尚未全部载入的内容
+        self.load_offset = 0
+        self.load_generation = 0
+        self.validate_thread = None  # 正在运行的校验线程，同一时间只有一个
+        self.validation_id = 0
         self.initUI()
         self.is_maximized = False
         self.original_geometry = None
@@ -587,6 +704,111 @@ class EditorWidget(QWidget):
         self.highlighter = NucleiPOCHighlighter(self.editor.document())
         layout.addWidget(self.editor)
 
+        # 输入停顿后在后台校验模板
+        self.validate_timer = QTimer(self)
+        self.validate_timer.setSingleShot(True)
+        self.validate_timer.setInterval(self.VALIDATE_DELAY_MS)
+        self.validate_timer.timeout.connect(self.startValidation)
+        self.editor.textChanged.connect(self.scheduleValidation)
+
+    def isLargeContent(self, content):
+        if len(content) > self.LARGE_FILE_SIZE:
+            return True
+        return any(len(line) > self.LONG_LINE_LENGTH for line in content.split('\n'))
+
+    def isLoading(self):
+        """大文件是否仍在分块加载，此时编辑器中的内容不完整"""
+        return self.pending_content is not None
+
+    def loadContent(self, content):
+        """把内容载入编辑器；大文件在后续的事件循环中分块追加，加载期间编辑器只读"""
+        self.load_generation += 1
+        self.large_file = self.isLargeContent(content)
+        self.highlighter.max_line_length = self.HIGHLIGHT_LINE_LIMIT if self.large_file else None
+        self.editor.indent_guide_limit = self.LONG_LINE_LENGTH if self.large_file else None
+        document = self.editor.document()
+        if not self.large_file:
+            self.pending_content = None
+            self.editor.setReadOnly(False)
+            document.setUndoRedoEnabled(True)
+            self.editor.setPlainText(content)
+            return
+
+        self.editor.setReadOnly(True)
+        document.setUndoRedoEnabled(False)  # 分块追加不进入撤销历史
+        self.editor.setPlainText('')
+        self.pending_content = content
+        self.load_offset = 0
+        generation = self.load_generation
+        QTimer.singleShot(0, lambda: self.loadNextChunk(generation))
+
+    def loadNextChunk(self, generation):
+        if generation != self.load_generation:
+            return  # 已经载入了其他内容
+        content = self.pending_content
+        start = self.load_offset
+        end = content.find('\n', min(start + self.LOAD_CHUNK_SIZE, len(content)))
+        end = len(content) if end < 0 else end + 1
+        cursor = QTextCursor(self.editor.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(content[start:end])
+        self.load_offset = end
+        if end < len(content):
+            QTimer.singleShot(0, lambda: self.loadNextChunk(generation))
+            return
+
+        self.pending_content = None
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.setReadOnly(False)
+        self.loadFinished.emit()
+
+    def scheduleValidation(self):
+        """内容变化：作废进行中的校验并重新计时；大文件只在保存时校验"""
+        self.validation_id += 1
+        if self.validate_thread is not None:
+            self.validate_thread.cancel()
+        if self.editor.issues:
+            self.editor.set_issues([])  # 旧的位置已不可靠
+        if self.wantsValidation():
+            self.validate_timer.start()
+        else:
+            self.validate_timer.stop()
+
+    def startValidation(self):
+        if self.validate_thread is not None:
+            return  # 被取消的校验结束后再用最新内容校验
+        self.validate_thread = TemplateValidateThread(self.validation_id, self.editor.toPlainText())
+        self.validate_thread.validated.connect(self.onValidated)
+        self.validate_thread.finished.connect(self.onValidateThreadFinished)
+        self.validate_thread.start()
+
+    def onValidated(self, validation_id, issues):
+        if validation_id != self.validation_id:
+            return  # 内容已经变化
+        self.showIssues(issues)
+
+    def onValidateThreadFinished(self):
+        thread = self.validate_thread
+        self.validate_thread = None
+        thread.deleteLater()
+        if thread.validation_id != self.validation_id and not self.validate_timer.isActive() and self.wantsValidation():
+            self.startValidation()
+
+    def wantsValidation(self):
+        return not self.isLoading() and not self.large_file and not self.editor.document().isEmpty()
+
+    def showIssues(self, issues):
+        self.editor.set_issues(issues)
+        self.issuesChanged.emit(issues)
+
+    def stopValidation(self):
+        """关闭窗口前停止后台校验"""
+        self.validate_timer.stop()
+        self.validation_id += 1
+        if self.validate_thread is not None:
+            self.validate_thread.cancel()
+            self.validate_thread.wait()
+
     def setupContextMenu(self):
         self.editor.setContextMenuPolicy(Qt.CustomContextMenu)
         self.editor.customContextMenuRequested.connect(self.showContextMenu)
@@ -610,6 +832,8 @@ class EditorWidget(QWidget):
         copy_action = menu.addAction("复制")
         paste_action = menu.addAction("粘贴")
         cut_action = menu.addAction("剪切")
+        menu.addSeparator()
+        similar_action = menu.addAction("查找相似模板")
 
         action = menu.exec_(self.editor.mapToGlobal(pos))
 
@@ -619,104 +843,3131 @@ class EditorWidget(QWidget):
             self.editor.paste()
         elif action == cut_action:
             self.editor.cut()
+        elif action == similar_action:
+            self.similarRequested.emit(self.editor.toPlainText())
+
+    def toggleMaximize(self):
+        if not self.is_maximized:
+            parent = self.parent()
+            while parent and not isinstance(parent, QMainWindow):
+                parent = parent.parent()
+
+            if parent:
+                self.main_window = parent
+                self.original_geometry = self.geometry()
+                self.original_parent = self.parent()
+
+                central_widget = self.main_window.centralWidget()
+                main_rect = central_widget.rect()
+                global_pos = central_widget.mapToGlobal(main_rect.topLeft())
+
+                self.setParent(None)
+                self.setGeometry(QRect(global_pos, main_rect.size()))
+                self.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint)
+                self.show()
+                self.maximize_btn.setText("❐")
+                self.raise_()
+                self.activateWindow()
+        else:
+            if self.original_parent and self.original_geometry:
+                self.setParent(self.original_parent)
+                self.setGeometry(self.original_geometry)
+                self.setWindowFlags(Qt.Widget)
+                self.show()
+                self.maximize_btn.setText("□")
+
+        self.is_maximized = not self.is_maximized
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape and self.is_maximized:
+            self.toggleMaximize()
+        super().keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        if self.is_maximized:
+            self.drag_pos = event.globalPos()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self.is_maximized and hasattr(self, 'drag_pos'):
+            delta = event.globalPos() - self.drag_pos
+            self.move(self.pos() + delta)
+            self.drag_pos = event.globalPos()
+        super().mouseMoveEvent(event)
+
+
+# 新增一个线程类用于加载POC
+def readTemplateFile(folder_path, file_path):
+    """读取并解析单个模板，返回 (记录, 原文)；内容不是 YAML 映射时记录为 None"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    data = yaml.safe_load(content)
+    if not isinstance(data, dict):
+        return None, content
+    data['original_filename'] = os.path.relpath(file_path, folder_path)  # 使用相对路径加文件名
+    data['file_path'] = file_path
+    return data, content
+
+
+def fileState(file_path):
+    """文件的 (mtime, size)，用于判断会话快照中的模板是否已在磁盘上被修改"""
+    stat = os.stat(file_path)
+    return (stat.st_mtime, stat.st_size)
+
+
+def loadTemplateFolder(folder_path, progress=None, cancelled=None):
+    """加载目录下全部模板，返回 (记录列表, {文件路径: 原文}, {文件路径: (mtime, size)})；cancelled() 为真时返回 None"""
+    yaml_data = []
+    contents = {}  # 原文存储，供正则搜索使用
+    states = {}  # 加载时的文件状态，会话快照据此校验
+    total_files = 0
+
+    # 计算文件总数
+    for root, _, files in os.walk(folder_path):
+        total_files += sum(1 for file in files if file.lower().endswith('.yaml'))
+
+    processed_files = 0  # 处理的文件计数
+
+    try:
+        for root, _, files in os.walk(folder_path):
+            for file in files:
+                if file.lower().endswith('.yaml'):
+                    if cancelled is not None and cancelled():
+                        return None
+                    file_path = os.path.join(root, file)
+                    try:
+                        state = fileState(file_path)
+                        data, content = readTemplateFile(folder_path, file_path)
+                        if data is not None:
+                            yaml_data.append(data)
+                            contents[file_path] = content
+                            states[file_path] = state
+                    except Exception as e:
+                        print(f"加载文件出错 {file}: {str(e)}")
+
+                    processed_files += 1
+                    if progress is not None:
+                        progress(int((processed_files / total_files) * 100))  # 更新进度
+
+    except Exception as e:
+        print(f"加载目录失败: {str(e)}")
+
+    return yaml_data, contents, states
+
+
+TemplateIssue = namedtuple('TemplateIssue', 'line column message fatal')  # 行列从 0 开始；fatal 为 YAML 本身无法解析
+TEMPLATE_SEVERITIES = ('info', 'low', 'medium', 'high', 'critical', 'unknown')
+TEMPLATE_ID_PATTERN = re.compile(r'([a-zA-Z0-9]+[-_])*[a-zA-Z0-9]+')
+
+
+class ValidationCancelled(Exception):
+    """校验已被更新的内容取代"""
+
+
+class CancellableLoader(yaml.SafeLoader):
+    """每构建一个节点检查一次取消标志，过时的校验不必解析完整个文档"""
+
+    def __init__(self, stream, cancelled=None):
+        super().__init__(stream)
+        self.cancelled = cancelled
+
+    def compose_node(self, parent, index):
+        if self.cancelled is not None and self.cancelled():
+            raise ValidationCancelled()
+        return super().compose_node(parent, index)
+
+
+def validateTemplate(content, cancelled=None):
+    """校验模板：YAML 语法以及 nuclei 必填的 id、info.name、info.severity，返回 [TemplateIssue]"""
+    if not content.strip():
+        return []  # 空白内容是新建模板的初始状态
+    loader = CancellableLoader(content, cancelled)
+    try:
+        node = loader.get_single_node()
+        data = loader.construct_document(node) if node is not None else None
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        return [TemplateIssue(mark.line if mark else 0, mark.column if mark else 0,
+                              f"YAML 语法错误: {e.problem or e.context}", True)]
+    except yaml.YAMLError as e:
+        return [TemplateIssue(0, 0, f"YAML 语法错误: {e}", True)]
+    finally:
+        loader.dispose()
+    if not isinstance(data, dict):
+        return [TemplateIssue(0, 0, "模板必须是 YAML 映射（键: 值）", True)]
+
+    def children(mapping):
+        """映射节点中 键 -> (键节点, 值节点)，用于定位问题所在的行"""
+        return {key.value: (key, value) for key, value in mapping.value if isinstance(key, yaml.ScalarNode)}
+
+    def issueAt(node, message):
+        return TemplateIssue(node.start_mark.line, node.start_mark.column, message, False)
+
+    issues = []
+    nodes = children(node)
+    template_id = data.get('id')
+    if not template_id:
+        issues.append(TemplateIssue(0, 0, "缺少必填字段 id", False))
+    elif not TEMPLATE_ID_PATTERN.fullmatch(str(template_id)):
+        issues.append(issueAt(nodes['id'][1], "id 只能由字母、数字以及 - 或 _ 分隔组成"))
+
+    info = data.get('info')
+    if 'info' not in nodes:
+        issues.append(TemplateIssue(0, 0, "缺少必填字段 info", False))
+    elif not isinstance(info, dict):
+        issues.append(issueAt(nodes['info'][0], "info 必须是映射"))
+    else:
+        info_nodes = children(nodes['info'][1])
+        for field in ('name', 'severity'):
+            if not info.get(field):
+                issues.append(issueAt(nodes['info'][0], f"缺少必填字段 info.{field}"))
+        severity = info.get('severity')
+        if severity and str(severity).lower() not in TEMPLATE_SEVERITIES:
+            issues.append(issueAt(info_nodes['severity'][1],
+                                  f"未知的危害等级 {severity}，应为 {', '.join(TEMPLATE_SEVERITIES)} 之一"))
+    return issues
+
+
+class LoadPOCThread(QThread):
+    finished = pyqtSignal(list, dict, dict)  # 定义信号，用于传递加载的POC数据、{文件路径: 原文} 及 {文件路径: (mtime, size)}
+    progress = pyqtSignal(int)  # 定义信号，用于更新进度
+
+    def __init__(self, folder_path):
+        super().__init__()
+        self.folder_path = folder_path
+
+    def run(self):
+        yaml_data, contents, states = loadTemplateFolder(self.folder_path, self.progress.emit)
+        self.finished.emit(yaml_data, contents, states)  # 发射信号，传递加载的数据
+
+
+class SessionValidateThread(QThread):
+    """在后台用磁盘校验会话快照：逐个比较文件的 mtime/size，只重新解析新增或修改过的文件"""
+    validated = pyqtSignal(list, list, dict)  # ([(记录, 原文)], 已删除的文件路径, {文件路径: (mtime, size)})
+
+    def __init__(self, folder_path, states):
+        super().__init__()
+        self.folder_path = folder_path
+        self.states = states
+
+    def run(self):
+        changed = []
+        seen = {}
+        for root, _, files in os.walk(self.folder_path):
+            for file in files:
+                if not file.lower().endswith('.yaml'):
+                    continue
+                file_path = os.path.join(root, file)
+                try:
+                    state = fileState(file_path)
+                    if self.states.get(file_path) != state:
+                        data, content = readTemplateFile(self.folder_path, file_path)
+                        if data is None:
+                            continue
+                        changed.append((data, content))
+                    seen[file_path] = state
+                except Exception as e:
+                    print(f"加载文件出错 {file}: {str(e)}")
+        removed = [file_path for file_path in self.states if file_path not in seen]
+        self.validated.emit(changed, removed, seen)
+
+
+class TemplateValidateThread(QThread):
+    """在后台校验编辑器中的内容，被更新的内容取代时取消"""
+    validated = pyqtSignal(int, list)  # (校验序号, [TemplateIssue])
+
+    def __init__(self, validation_id, content):
+        super().__init__()
+        self.validation_id = validation_id
+        self.content = content
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            issues = validateTemplate(self.content, lambda: self.cancelled)
+        except ValidationCancelled:
+            return
+        if not self.cancelled:
+            self.validated.emit(self.validation_id, issues)
+
+
+FolderIndexEntry = namedtuple('FolderIndexEntry', 'state contents states size')  # 常驻目录：索引状态、{rid: 原文}、文件状态、估算字节数
+
+
+class FolderIndexCache:
+    """最近使用目录的常驻索引（LRU），同时受目录个数与估算内存上限约束
+
+    当前目录不在缓存中：切换目录时把它的索引放回缓存，切换到缓存中的目录时取出，
+    因此同一份索引对象任一时刻只属于一个地方。
+    """
+
+    # 常驻内存约为模板文件总大小的倍数（解析后的记录、原文与各项索引），按 2000 个模板实测约 17 倍
+    SIZE_FACTOR = 18
+
+    def __init__(self, capacity=2, memory_limit=1024 << 20):
+        self.capacity = capacity
+        self.memory_limit = memory_limit
+        self.entries = OrderedDict()  # 目录 -> FolderIndexEntry，末尾为最近使用
+
+    @classmethod
+    def estimateSize(cls, states):
+        return sum(size for _, size in states.values()) * cls.SIZE_FACTOR
+
+    def __contains__(self, folder):
+        return folder in self.entries
+
+    def memoryUsage(self):
+        return sum(entry.size for entry in self.entries.values())
+
+    def put(self, folder, entry):
+        self.entries.pop(folder, None)
+        if self.capacity <= 0 or entry.size > self.memory_limit:
+            return
+        self.entries[folder] = entry
+        while len(self.entries) > self.capacity or self.memoryUsage() > self.memory_limit:
+            self.entries.popitem(last=False)
+
+    def take(self, folder):
+        return self.entries.pop(folder, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class FolderPrefetchThread(QThread):
+    """以空闲优先级预先加载并索引历史记录中常用的目录，结果交给 FolderIndexCache"""
+    folderIndexed = pyqtSignal(str, object)  # (目录, FolderIndexEntry)
+
+    def __init__(self, folders, memory_limit):
+        super().__init__()
+        self.folders = folders
+        self.memory_limit = memory_limit
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        for folder in self.folders:
+            # 先按文件大小估算，超出内存上限的目录不预取
+            size = 0
+            for root, _, files in os.walk(folder):
+                if self.cancelled:
+                    return
+                for file in files:
+                    if file.lower().endswith('.yaml'):
+                        try:
+                            size += os.path.getsize(os.path.join(root, file))
+                        except OSError:
+                            pass
+            if size * FolderIndexCache.SIZE_FACTOR > self.memory_limit:
+                continue
+            loaded = loadTemplateFolder(folder, cancelled=lambda: self.cancelled)
+            if loaded is None or self.cancelled:
+                return
+            yaml_data, contents, states = loaded
+            index = PocIndex()
+            index.rebuild(yaml_data, contents)
+            self.folderIndexed.emit(folder, FolderIndexEntry(index.snapshotState(), index.contents, states,
+                                                             FolderIndexCache.estimateSize(states)))
+
+
+def splitQueryTokens(text):
+    """按空白拆分搜索框内容，支持用双引号包含空格或冒号，例如 author:"john doe\""""
+    lexer = shlex.shlex(text, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ''
+    lexer.escape = ''
+    try:
+        return list(lexer)
+    except ValueError:
+        # 引号不成对时退回简单拆分
+        return text.split()
+
+
+def normalizeQuery(keywords):
+    """规范化关键词，作为缓存键的一部分：关键词小写、去重排序，操作符统一"""
+    use_and = 'AND' in keywords
+    terms = sorted(set(kw.lower() for kw in keywords if kw not in ('AND', 'OR')))
+    return ('AND' if use_and else 'OR', tuple(terms))
+
+
+# 数值范围过滤，例如 year>=2023 cvss>=9 epss>0.5
+RANGE_FILTER_PATTERN = re.compile(r'^(year|cvss|epss)(>=|<=|≥|≤|>|<|=)(\d+(?:\.\d+)?)$', re.IGNORECASE)
+# 分面过滤，例如 severity:critical tag:cve author:hugh protocol:http
+FACET_FILTER_PATTERN = re.compile(r'^(severity|tag|author|protocol):(.+)$', re.IGNORECASE)
+# 结构化过滤，例如 req.path:/actuator matcher.word:"root:x:0"
+STRUCT_FILTER_PATTERN = re.compile(
+    r'^(req\.path|req\.method|matcher\.word|matcher\.regex|matcher\.status|extractor\.name):(.+)$', re.IGNORECASE)
+CVE_ID_PATTERN = re.compile(r'CVE-(\d{4})-(\d+)', re.IGNORECASE)
+
+# operator/terms 为关键词部分（同 normalizeQuery），ranges 为 (字段, 下界, 上界, 含下界, 含上界) 元组，
+# facets 为 (分面, 值) 元组，structs 为 (结构字段, 子串) 元组
+SearchQuery = namedtuple('SearchQuery', ['operator', 'terms', 'ranges', 'facets', 'structs'])
+
+
+def parseSearchQuery(text):
+    """解析搜索框内容：拆分出数值范围、分面与结构化过滤，其余部分按关键词处理
+
+    过滤条件总是与关键词结果取交集，与 AND/OR 无关。
+    """
+    ranges = []
+    facets = []
+    structs = []
+    keywords = []
+    for token in splitQueryTokens(text):
+        facet_match = FACET_FILTER_PATTERN.match(token)
+        if facet_match:
+            facets.append((facet_match.group(1).lower(), facet_match.group(2).strip().lower()))
+            continue
+        struct_match = STRUCT_FILTER_PATTERN.match(token)
+        if struct_match:
+            structs.append((struct_match.group(1).lower(), struct_match.group(2).lower()))
+            continue
+        match = RANGE_FILTER_PATTERN.match(token)
+        if not match:
+            keywords.append(token)
+            continue
+        field, op, value = match.group(1).lower(), match.group(2), float(match.group(3))
+        if op in ('>=', '≥'):
+            ranges.append((field, value, None, True, False))
+        elif op == '>':
+            ranges.append((field, value, None, False, False))
+        elif op in ('<=', '≤'):
+            ranges.append((field, None, value, False, True))
+        elif op == '<':
+            ranges.append((field, None, value, False, False))
+        else:
+            ranges.append((field, value, value, True, True))
+    operator, terms = normalizeQuery(keywords)
+    return SearchQuery(operator, terms, tuple(sorted(ranges, key=repr)), tuple(sorted(set(facets))),
+                       tuple(sorted(set(structs))))
+
+
+def toFloat(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def splitListField(value):
+    """tags/author 既可能是列表也可能是逗号分隔的字符串"""
+    if isinstance(value, list):
+        items = value
+    else:
+        items = str(value or '').split(',')
+    return sorted(set(str(item).strip().lower() for item in items if str(item).strip()))
+
+
+# 模板顶层键 -> 协议名
+PROTOCOL_KEYS = {
+    'http': 'http', 'requests': 'http', 'dns': 'dns', 'file': 'file', 'network': 'network',
+    'tcp': 'network', 'headless': 'headless', 'ssl': 'ssl', 'websocket': 'websocket',
+    'whois': 'whois', 'code': 'code', 'javascript': 'javascript', 'workflows': 'workflow',
+}
+
+
+HTTP_METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS', 'PATCH', 'TRACE', 'CONNECT')
+
+
+def asList(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def extractStructFields(record):
+    """提取请求路径、方法、匹配器 words/regex/status 与提取器名称，供结构化索引使用"""
+    fields = {'req.path': set(), 'req.method': set(), 'matcher.word': set(), 'matcher.regex': set(),
+              'matcher.status': set(), 'extractor.name': set()}
+    for key in PROTOCOL_KEYS:
+        for block in asList(record.get(key)):
+            if not isinstance(block, dict):
+                continue
+            if PROTOCOL_KEYS[key] == 'http':
+                for path in asList(block.get('path')):
+                    fields['req.path'].add(str(path).strip().lower())
+                method = block.get('method')
+                if method:
+                    fields['req.method'].add(str(method).strip().lower())
+                for raw in asList(block.get('raw')):
+                    # raw 请求取请求行，跳过 @timeout 之类的注解行
+                    for line in str(raw).strip().splitlines():
+                        line = line.strip()
+                        if not line or line.startswith('@'):
+                            continue
+                        parts = line.split()
+                        if len(parts) >= 2 and parts[0].upper() in HTTP_METHODS:
+                            fields['req.method'].add(parts[0].lower())
+                            fields['req.path'].add(parts[1].lower())
+                        break
+            for matcher in asList(block.get('matchers')):
+                if not isinstance(matcher, dict):
+                    continue
+                fields['matcher.word'].update(str(word).lower() for word in asList(matcher.get('words')))
+                fields['matcher.regex'].update(str(regex).lower() for regex in asList(matcher.get('regex')))
+                fields['matcher.status'].update(str(status).strip() for status in asList(matcher.get('status')))
+            for extractor in asList(block.get('extractors')):
+                if isinstance(extractor, dict) and extractor.get('name'):
+                    fields['extractor.name'].add(str(extractor['name']).strip().lower())
+    return {field: sorted(values) for field, values in fields.items()}
+
+
+def extractIndexFields(record):
+    """提取建索引用的字段：CVE 年份、CVSS/EPSS 分数（缺失为 None）、各分面以及结构化字段的取值"""
+    info = record.get('info', {}) or {}
+    classification = info.get('classification', {}) or {}
+    cve_id = classification.get('cve-id') or record.get('id') or ''
+    if isinstance(cve_id, list):
+        cve_id = cve_id[0] if cve_id else ''
+    match = CVE_ID_PATTERN.search(str(cve_id))
+    severity = str(info.get('severity', '') or '').strip().lower()
+    fields = {
+        'year': float(match.group(1)) if match else None,
+        'cvss': toFloat(classification.get('cvss-score')),
+        'epss': toFloat(classification.get('epss-score')),
+        'severity': [severity] if severity else [],
+        'tag': splitListField(info.get('tags')),
+        'author': splitListField(info.get('author')),
+        'protocol': sorted(set(PROTOCOL_KEYS[key] for key in record if key in PROTOCOL_KEYS)),
+        'cve': sorted(set(str(value).strip().lower() for value in asList(classification.get('cve-id'))
+                          if str(value).strip())),
+    }
+    fields.update(extractStructFields(record))
+    return fields
+
+
+def ridsToBits(rids):
+    """把 rid 序列转换为位图（Python 整数），第 rid 位为 1"""
+    if not rids:
+        return 0
+    buffer = bytearray((max(rids) >> 3) + 1)
+    for rid in rids:
+        buffer[rid >> 3] |= 1 << (rid & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bitsToRids(bits, limit=None):
+    """按升序返回位图中为 1 的位，给定 limit 时只取前 limit 个"""
+    text = bin(bits)[:1:-1]
+    rids = []
+    pos = text.find('1')
+    while pos >= 0:
+        rids.append(pos)
+        if limit is not None and len(rids) >= limit:
+            break
+        pos = text.find('1', pos + 1)
+    return rids
+
+
+if hasattr(int, 'bit_count'):
+    bitCount = int.bit_count
+else:
+    def bitCount(bits):
+        return bin(bits).count('1')
+
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+SIMILARITY_STOPWORDS = frozenset((
+    'the', 'and', 'for', 'with', 'this', 'that', 'from', 'are', 'was', 'can', 'allows', 'via', 'http', 'https',
+    'baseurl', 'rooturl', 'hostname', 'host', 'www', 'com', 'html', 'index', 'get', 'post', 'true', 'false',
+))
+
+
+def similarityTokens(record, struct_fields=None):
+    """从模板 info 与请求中提取用于相似度计算的词项，struct_fields 可复用已提取的结构化字段"""
+    info = record.get('info', {}) or {}
+    parts = [str(record.get('id', '')), str(info.get('name', '')), str(info.get('description', ''))]
+    parts.extend(splitListField(info.get('tags')))
+    metadata = info.get('metadata')
+    if isinstance(metadata, dict):
+        parts.extend(str(value) for value in metadata.values())
+    if struct_fields is None:
+        struct_fields = extractStructFields(record)
+    for field in ('req.path', 'matcher.word', 'matcher.regex'):
+        parts.extend(struct_fields[field])
+    tokens = []
+    for token in TOKEN_PATTERN.findall(' '.join(parts).lower()):
+        if len(token) < 2 or token in SIMILARITY_STOPWORDS or (token.isdigit() and len(token) < 4):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+class SimilarityIndex:
+    """基于 TF-IDF 向量的相似模板索引
+
+    文档向量在加载时一次性计算（单位长度），保存时只重算被修改的文档。
+    倒排表 term -> {rid: 权重} 用于只对共享词项的文档计算余弦相似度，top-k 用堆选取。
+    """
+
+    MAX_QUERY_TERMS = 32  # 查询向量只保留权重最高的若干词项
+    MAX_DF_RATIO = 0.5  # 过于常见的词项对相似度贡献很小，查询时跳过
+
+    def __init__(self):
+        self.df = {}
+        self.doc_count = 0
+        self.vectors = {}  # rid -> {term: 权重}
+        self.postings = {}  # term -> {rid: 权重}
+
+    def idf(self, term):
+        return math.log((1 + self.doc_count) / (1 + self.df.get(term, 0))) + 1.0
+
+    def weigh(self, tokens):
+        """词频 * idf，并归一化为单位向量"""
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        vector = {term: (1 + math.log(tf)) * self.idf(term) for term, tf in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if norm:
+            vector = {term: weight / norm for term, weight in vector.items()}
+        return vector
+
+    def rebuild(self, tokens_by_rid):
+        self.df = {}
+        for tokens in tokens_by_rid.values():
+            for term in set(tokens):
+                self.df[term] = self.df.get(term, 0) + 1
+        self.doc_count = len(tokens_by_rid)
+        self.vectors = {}
+        self.postings = {}
+        for rid, tokens in tokens_by_rid.items():
+            self.addVector(rid, self.weigh(tokens))
+
+    def addVector(self, rid, vector):
+        self.vectors[rid] = vector
+        for term, weight in vector.items():
+            self.postings.setdefault(term, {})[rid] = weight
+
+    def add(self, rid, tokens):
+        for term in set(tokens):
+            self.df[term] = self.df.get(term, 0) + 1
+        self.doc_count += 1
+        self.addVector(rid, self.weigh(tokens))
+
+    def remove(self, rid):
+        vector = self.vectors.pop(rid, None)
+        if vector is None:
+            return
+        self.doc_count -= 1
+        for term in vector:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(rid, None)
+                if not postings:
+                    del self.postings[term]
+            df = self.df.get(term, 0) - 1
+            if df > 0:
+                self.df[term] = df
+            else:
+                self.df.pop(term, None)
+
+    def topK(self, tokens, k=20, exclude=None):
+        """返回与给定词项最相似的 k 个 (rid, 余弦相似度)"""
+        query = self.weigh(tokens)
+        max_df = max(1, int(self.doc_count * self.MAX_DF_RATIO))
+        terms = [(weight, term) for term, weight in query.items()
+                 if term in self.postings and self.df.get(term, 0) <= max_df]
+        terms = heapq.nlargest(self.MAX_QUERY_TERMS, terms)
+
+        scores = {}
+        for query_weight, term in terms:
+            for rid, weight in self.postings[term].items():
+                scores[rid] = scores.get(rid, 0.0) + query_weight * weight
+        if exclude is not None:
+            scores.pop(exclude, None)
+        return heapq.nlargest(k, scores.items(), key=lambda entry: entry[1])
+
+
+class RankedResults:
+    """按相关度排序的结果集：只用堆选出当前需要的前缀，不对全部匹配项完整排序"""
+
+    def __init__(self, scored):
+        self.scored = scored  # [(分数, -rid)]，分数相同按原始顺序
+        self.ranked = []
+
+    def __len__(self):
+        return len(self.scored)
+
+    def prefix(self, n):
+        """返回排名前 n 的 rid；需要更多时按倍数扩大堆选择的范围"""
+        if n > len(self.ranked) and len(self.ranked) < len(self.scored):
+            size = min(len(self.scored), max(n, 2 * len(self.ranked)))
+            self.ranked = [-neg_rid for _, neg_rid in heapq.nlargest(size, self.scored)]
+        return self.ranked[:n]
+
+    def at(self, position):
+        """返回排名第 position 的 rid，不复制前缀"""
+        if position >= len(self.ranked):
+            self.prefix(position + 1)
+        return self.ranked[position]
+
+
+class RelevanceIndex:
+    """BM25F 风格的相关度打分
+
+    id、名称、标签中的命中权重高于描述，查询词与模板 id 或 CVE 编号完全相同时额外加分。
+    词频按字段文本的子串计数，与关键词搜索的子串语义保持一致。
+    """
+
+    FIELD_WEIGHTS = (('id', 3.0), ('name', 3.0), ('tags', 2.5), ('description', 1.0))
+    K1 = 1.2
+    B = 0.75
+    EXACT_ID_BOOST = 5.0
+    EXACT_CVE_BOOST = 10.0
+
+    def __init__(self):
+        self.texts = {}  # rid -> {字段: 小写文本, 'cve': 小写 CVE 编号}
+        self.lengths = {}  # rid -> {字段: 词数}
+        self.total_lengths = {field: 0 for field, _ in self.FIELD_WEIGHTS}
+        self.df_cache = {}
+
+    @staticmethod
+    def fieldTexts(record):
+        info = record.get('info', {}) or {}
+        classification = info.get('classification', {}) or {}
+        cve = classification.get('cve-id') or ''
+        if isinstance(cve, list):
+            cve = ' '.join(str(item) for item in cve)
+        return {
+            'id': str(record.get('id', '') or '').lower(),
+            'name': str(info.get('name', '') or '').lower(),
+            'tags': ' '.join(splitListField(info.get('tags'))),
+            'description': str(info.get('description', '') or '').lower(),
+            'cve': str(cve).lower(),
+        }
+
+    def rebuild(self, records):
+        self.texts = {}
+        self.lengths = {}
+        self.total_lengths = {field: 0 for field, _ in self.FIELD_WEIGHTS}
+        for rid, record in records.items():
+            self.add(rid, record)
+
+    def add(self, rid, record):
+        texts = self.fieldTexts(record)
+        lengths = {field: max(1, len(TOKEN_PATTERN.findall(texts[field]))) for field, _ in self.FIELD_WEIGHTS}
+        self.texts[rid] = texts
+        self.lengths[rid] = lengths
+        for field, length in lengths.items():
+            self.total_lengths[field] += length
+        self.df_cache = {}
+
+    def remove(self, rid):
+        self.texts.pop(rid, None)
+        lengths = self.lengths.pop(rid, None)
+        if lengths:
+            for field, length in lengths.items():
+                self.total_lengths[field] -= length
+        self.df_cache = {}
+
+    def df(self, term):
+        """包含该词的文档数（只统计加权字段），按索引状态缓存"""
+        count = self.df_cache.get(term)
+        if count is None:
+            count = sum(1 for texts in self.texts.values()
+                        if any(term in texts[field] for field, _ in self.FIELD_WEIGHTS))
+            self.df_cache[term] = count
+        return count
+
+    def rank(self, rids, terms):
+        """为匹配结果打分，返回 RankedResults"""
+        doc_count = max(1, len(self.texts))
+        avg_lengths = {field: max(1.0, total / doc_count) for field, total in self.total_lengths.items()}
+        idfs = [(term, math.log(1 + (doc_count - self.df(term) + 0.5) / (self.df(term) + 0.5))) for term in terms]
+
+        scored = []
+        for rid in rids:
+            texts = self.texts.get(rid)
+            if texts is None:
+                continue
+            lengths = self.lengths[rid]
+            score = 0.0
+            for term, idf in idfs:
+                weighted_tf = 0.0
+                for field, weight in self.FIELD_WEIGHTS:
+                    tf = texts[field].count(term)
+                    if tf:
+                        norm = 1 - self.B + self.B * lengths[field] / avg_lengths[field]
+                        weighted_tf += weight * tf / norm
+                if weighted_tf:
+                    score += idf * weighted_tf / (self.K1 + weighted_tf)
+                if term == texts['id']:
+                    score += self.EXACT_ID_BOOST
+                if CVE_ID_PATTERN.fullmatch(term) and term in texts['cve'].split():
+                    score += self.EXACT_CVE_BOOST
+            scored.append((score, -rid))
+        return RankedResults(scored)
+
+
+class ValueGramIndex:
+    """高基数字段的稀疏倒排：取值 -> rid 数组，另对取值建字符三元组倒排供子串查询
+
+    三元组倒排在该字段第一次子串查询时才构建，之后随增删维护。子串查询取 needle 中最稀有的三元组
+    对应的取值作候选，逐个确认包含关系，只合并确认命中的 rid 数组。
+    取值编号分配后不回收：rid 清空的取值从 postings 中删除，三元组倒排里残留的编号在查询时跳过，重建时清理。
+    """
+
+    GRAM = 3
+
+    def __init__(self):
+        self.postings = {}  # 取值 -> array('I')，rid 升序
+        self.value_ids = {}  # 取值 -> 取值编号
+        self.values = []  # 取值编号 -> 取值
+        self.grams = None  # 三元组 -> array('I')，取值编号；尚未构建时为 None
+
+    @classmethod
+    def valueGrams(cls, value):
+        return {value[i:i + cls.GRAM] for i in range(len(value) - cls.GRAM + 1)}
+
+    def rebuild(self, postings):
+        """postings 为 {取值: 升序的 rid 数组}"""
+        self.__init__()
+        self.postings = postings
+
+    def buildGrams(self):
+        self.values = list(self.postings)
+        self.value_ids = {value: value_id for value_id, value in enumerate(self.values)}
+        grams = {}
+        valueGrams = self.valueGrams
+        for value_id, value in enumerate(self.values):
+            for gram in valueGrams(value):
+                ids = grams.get(gram)
+                if ids is None:
+                    grams[gram] = [value_id]
+                else:
+                    ids.append(value_id)
+        self.grams = {gram: array('I', ids) for gram, ids in grams.items()}
+
+    def addValue(self, value):
+        value_id = len(self.values)
+        self.value_ids[value] = value_id
+        self.values.append(value)
+        for gram in self.valueGrams(value):
+            self.grams.setdefault(gram, array('I')).append(value_id)
+
+    def add(self, value, rid):
+        rids = self.postings.get(value)
+        if rids is None:
+            rids = self.postings[value] = array('I')
+            if self.grams is not None and value not in self.value_ids:
+                self.addValue(value)
+        bisect.insort(rids, rid)
+
+    def remove(self, value, rid):
+        rids = self.postings.get(value)
+        if rids is None:
+            return
+        pos = bisect.bisect_left(rids, rid)
+        if pos < len(rids) and rids[pos] == rid:
+            del rids[pos]
+            if not rids:
+                del self.postings[value]
+
+    def get(self, value):
+        return self.postings.get(value, ())
+
+    def matchingValues(self, needle):
+        """包含 needle 的取值；needle 不足一个三元组时顺序扫描全部取值"""
+        if len(needle) < self.GRAM:
+            return [value for value in self.postings if needle in value]
+        if self.grams is None:
+            self.buildGrams()
+        rarest = None
+        for gram in self.valueGrams(needle):
+            ids = self.grams.get(gram)
+            if ids is None:
+                return []
+            if rarest is None or len(ids) < len(rarest):
+                rarest = ids
+        # 只取最稀有的三元组作候选，逐个确认包含关系比与其他（可能很长的）编号数组求交更快
+        values = (self.values[value_id] for value_id in rarest)
+        return [value for value in values if needle in value and value in self.postings]
+
+    def substringRids(self, needle):
+        rids = []
+        for value in self.matchingValues(needle):
+            rids.extend(self.postings[value])
+        return rids
+
+
+class PocIndex:
+    """POC 记录索引：为每条记录分配稳定的 rid，并维护索引代数
+
+    rid 按加载顺序递增分配，新文件追加在末尾，因此按 rid 升序即为原始顺序。
+    任何修改（加载、保存、删除）都会使 generation 递增，依赖索引的缓存据此失效。
+    """
+
+    RANGE_FIELDS = ('year', 'cvss', 'epss')
+    FACET_FIELDS = ('severity', 'tag', 'author', 'protocol')
+    STRUCT_FIELDS = ('req.path', 'req.method', 'matcher.word', 'matcher.regex', 'matcher.status', 'extractor.name')
+    # 这些结构字段按精确值匹配，其余按子串匹配
+    EXACT_STRUCT_FIELDS = ('req.method', 'matcher.status')
+    # 取值较少的字段，倒排存位图
+    POSTING_FIELDS = FACET_FIELDS + EXACT_STRUCT_FIELDS
+    # 几乎每条记录取值都不同的字段，倒排存 rid 数组而不是位图，避免每个取值占用 rid 上界 / 8 字节，查询时才转成位图
+    SPARSE_POSTING_FIELDS = ('cve', 'req.path', 'matcher.word', 'matcher.regex', 'extractor.name')
+    FACET_SCAN_LIMIT = 2000  # 结果集不超过此数时分面计数逐条统计，否则与各取值的位图求交
+
+    def __init__(self):
+        self.records = {}  # rid -> 记录
+        self.rid_by_path = {}  # 文件路径 -> rid
+        self.fields = {}  # rid -> 加载时提取的字段值，删除时据此撤销索引
+        # 数值范围索引：按值排序的并行数组，范围查询用 bisect 定位
+        self.range_values = {field: array('d') for field in self.RANGE_FIELDS}
+        self.range_rids = {field: array('I') for field in self.RANGE_FIELDS}
+        # 分面与结构化索引：字段 -> {值: 位图}
+        self.postings = {field: {} for field in self.POSTING_FIELDS}
+        self.sparse_postings = {field: ValueGramIndex() for field in self.SPARSE_POSTING_FIELDS}
+        self.all_bits = 0
+        self.contents = {}  # rid -> 模板原文
+        self.similarity = SimilarityIndex()
+        self.relevance = RelevanceIndex()
+        self.facet_totals = None  # (generation, {分面: [(值, 总数), ...]})
+        self.next_rid = 0
+        self.generation = 0
+        # 订阅记录变更的观察者，需实现 indexRebuilt / recordAdded / recordRemoved
+        self.observers = []
+
+    def rebuild(self, yaml_data, contents=None):
+        """根据加载结果重建索引，排序数组与位图一次性构建；contents 为 {文件路径: 原文}"""
+        contents = contents or {}
+        self.records = {}
+        self.rid_by_path = {}
+        self.fields = {}
+        self.contents = {}
+        self.next_rid = 0
+        for record in yaml_data:
+            rid = self.next_rid
+            self.next_rid += 1
+            self.records[rid] = record
+            self.rid_by_path[record.get('file_path')] = rid
+            self.fields[rid] = extractIndexFields(record)
+            if record.get('file_path') in contents:
+                self.contents[rid] = contents[record.get('file_path')]
+
+        for field in self.RANGE_FIELDS:
+            entries = sorted((values[field], rid) for rid, values in self.fields.items()
+                             if values[field] is not None)
+            self.range_values[field] = array('d', (value for value, _ in entries))
+            self.range_rids[field] = array('I', (rid for _, rid in entries))
+
+        for field in self.POSTING_FIELDS:
+            postings = {}
+            for rid, values in self.fields.items():
+                for value in values[field]:
+                    postings.setdefault(value, []).append(rid)
+            self.postings[field] = {value: ridsToBits(rids) for value, rids in postings.items()}
+        for field in self.SPARSE_POSTING_FIELDS:
+            postings = {}
+            for rid, values in self.fields.items():
+                for value in values[field]:
+                    postings.setdefault(value, array('I')).append(rid)
+            self.sparse_postings[field].rebuild(postings)
+        self.all_bits = ridsToBits(list(self.records))
+        self.similarity.rebuild({rid: similarityTokens(record, self.fields[rid])
+                                 for rid, record in self.records.items()})
+        self.relevance.rebuild(self.records)
+        self.generation += 1
+        for observer in self.observers:
+            observer.indexRebuilt(self)
+
+    def add(self, record, content=None):
+        rid = self.next_rid
+        self.next_rid += 1
+        self.records[rid] = record
+        self.rid_by_path[record.get('file_path')] = rid
+        if content is not None:
+            self.contents[rid] = content
+        self.indexFields(rid, record)
+        self.generation += 1
+        for observer in self.observers:
+            observer.recordAdded(self, rid)
+        return rid
+
+    def update(self, rid, record, content=None):
+        for observer in self.observers:
+            observer.recordRemoved(self, rid)
+        self.unindexFields(rid)
+        self.records[rid] = record
+        self.rid_by_path[record.get('file_path')] = rid
+        if content is not None:
+            self.contents[rid] = content
+        else:
+            self.contents.pop(rid, None)
+        self.indexFields(rid, record)
+        self.generation += 1
+        for observer in self.observers:
+            observer.recordAdded(self, rid)
+
+    def remove(self, rid):
+        if rid in self.records:
+            for observer in self.observers:
+                observer.recordRemoved(self, rid)
+        record = self.records.pop(rid, None)
+        if record is not None:
+            self.rid_by_path.pop(record.get('file_path'), None)
+            self.contents.pop(rid, None)
+            self.unindexFields(rid)
+        self.generation += 1
+
+    def contentItems(self):
+        """(rid, 原文, 文件路径) 列表，原文缺失时由搜索方从磁盘读取"""
+        return [(rid, self.contents.get(rid), record.get('file_path')) for rid, record in self.records.items()]
+
+    def indexFields(self, rid, record):
+        values = extractIndexFields(record)
+        self.fields[rid] = values
+        for field in self.RANGE_FIELDS:
+            value = values[field]
+            if value is not None:
+                pos = bisect.bisect_right(self.range_values[field], value)
+                self.range_values[field].insert(pos, value)
+                self.range_rids[field].insert(pos, rid)
+        bit = 1 << rid
+        for field in self.POSTING_FIELDS:
+            postings = self.postings[field]
+            for value in values[field]:
+                postings[value] = postings.get(value, 0) | bit
+        for field in self.SPARSE_POSTING_FIELDS:
+            postings = self.sparse_postings[field]
+            for value in values[field]:
+                postings.add(value, rid)
+        self.all_bits |= bit
+        self.similarity.add(rid, similarityTokens(record, values))
+        self.relevance.add(rid, record)
+
+    def unindexFields(self, rid):
+        values = self.fields.pop(rid, None)
+        if values is None:
+            return
+        mask = ~(1 << rid)
+        for field in self.POSTING_FIELDS:
+            postings = self.postings[field]
+            for value in values[field]:
+                bits = postings.get(value, 0) & mask
+                if bits:
+                    postings[value] = bits
+                else:
+                    postings.pop(value, None)
+        for field in self.SPARSE_POSTING_FIELDS:
+            postings = self.sparse_postings[field]
+            for value in values[field]:
+                postings.remove(value, rid)
+        self.all_bits &= mask
+        self.similarity.remove(rid)
+        self.relevance.remove(rid)
+        for field in self.RANGE_FIELDS:
+            value = values[field]
+            if value is None:
+                continue
+            field_values = self.range_values[field]
+            field_rids = self.range_rids[field]
+            pos = bisect.bisect_left(field_values, value)
+            while pos < len(field_values) and field_values[pos] == value:
+                if field_rids[pos] == rid:
+                    del field_values[pos]
+                    del field_rids[pos]
+                    break
+                pos += 1
+
+    def rangeRids(self, field, low, high, include_low, include_high):
+        """返回字段值落在区间内的 rid 数组（按值排序）"""
+        values = self.range_values[field]
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect.bisect_left(values, low)
+        else:
+            start = bisect.bisect_right(values, low)
+        if high is None:
+            end = len(values)
+        elif include_high:
+            end = bisect.bisect_right(values, high)
+        else:
+            end = bisect.bisect_left(values, high)
+        return self.range_rids[field][start:end]
+
+    def structBits(self, field, needle):
+        """结构化字段查询：精确字段直接取位图，其余字段按子串匹配"""
+        if field in self.EXACT_STRUCT_FIELDS:
+            return self.postings[field].get(needle, 0)
+        return self.substringBits(field, needle)
+
+    def substringBits(self, field, needle):
+        """取值包含 needle 的记录位图：稀疏倒排经三元组求出命中的取值，位图倒排的取值较少，直接扫描"""
+        if field in self.sparse_postings:
+            return ridsToBits(self.sparse_postings[field].substringRids(needle))
+        bits = 0
+        for value, value_bits in self.postings[field].items():
+            if needle in value:
+                bits |= value_bits
+        return bits
+
+    def filterBits(self, query):
+        """范围、分面与结构化过滤的交集位图；没有过滤条件时返回 None"""
+        allowed = None
+        for spec in query.ranges:
+            bits = ridsToBits(self.rangeRids(*spec))
+            allowed = bits if allowed is None else allowed & bits
+        for field, value in query.facets:
+            bits = self.postings[field].get(value, 0)
+            allowed = bits if allowed is None else allowed & bits
+        for field, needle in query.structs:
+            bits = self.structBits(field, needle)
+            allowed = bits if allowed is None else allowed & bits
+        return allowed
+
+    def facetCounts(self, result_bits, limit=15):
+        """统计当前结果集在各分面上的数量，按数量降序取前 limit 个
+
+        全库的计数按代数缓存；结果集较小时逐条累加结果记录的取值，否则把结果位图与该分面的每个取值求交。
+        先统计结果集中出现的全部取值，最后才截取，不会漏掉全库不常见但在结果集中出现的取值。
+        """
+        if self.facet_totals is None or self.facet_totals[0] != self.generation:
+            totals = {}
+            for field in self.FACET_FIELDS:
+                values = [(value, bitCount(bits)) for value, bits in self.postings[field].items()]
+                values.sort(key=lambda entry: (-entry[1], entry[0]))
+                totals[field] = values
+            self.facet_totals = (self.generation, totals)
+
+        if result_bits == self.all_bits:
+            return {field: values[:limit] for field, values in self.facet_totals[1].items()}
+
+        result_rids = None
+        if bitCount(result_bits) <= self.FACET_SCAN_LIMIT:
+            result_rids = bitsToRids(result_bits)
+        counts = {}
+        for field in self.FACET_FIELDS:
+            if result_rids is not None:
+                field_totals = {}
+                for rid in result_rids:
+                    for value in self.fields[rid][field]:
+                        field_totals[value] = field_totals.get(value, 0) + 1
+                field_counts = list(field_totals.items())
+            else:
+                field_counts = [(value, bitCount(bits & result_bits)) for value, bits in self.postings[field].items()]
+                field_counts = [entry for entry in field_counts if entry[1]]
+            field_counts.sort(key=lambda entry: (-entry[1], entry[0]))
+            counts[field] = field_counts[:limit]
+        return counts
+
+    def search(self, query):
+        """执行 SearchQuery，返回按原始顺序排列的 rid 列表"""
+        allowed = self.filterBits(query)
+
+        if not query.terms:
+            return bitsToRids(allowed) if allowed is not None else list(self.records)
+
+        rids = []
+        candidates = bitsToRids(allowed) if allowed is not None else self.records
+        for rid in candidates:
+            if self.matchesTerms(rid, query):
+                rids.append(rid)
+        return rids
+
+    def matchesTerms(self, rid, query):
+        yaml_str = yaml.dump(self.records[rid], allow_unicode=True).lower()
+        if query.operator == 'AND':
+            return all(kw in yaml_str for kw in query.terms)
+        return any(kw in yaml_str for kw in query.terms)
+
+    def matchesQuery(self, rid, query):
+        """判断单条记录是否满足 SearchQuery，与 search 的结果保持一致，供增量维护使用"""
+        values = self.fields.get(rid)
+        if values is None:
+            return False
+        for field, low, high, include_low, include_high in query.ranges:
+            value = values[field]
+            if value is None:
+                return False
+            if low is not None and (value < low or (value == low and not include_low)):
+                return False
+            if high is not None and (value > high or (value == high and not include_high)):
+                return False
+        for field, value in query.facets:
+            if value not in values[field]:
+                return False
+        for field, needle in query.structs:
+            if field in self.EXACT_STRUCT_FIELDS:
+                if needle not in values[field]:
+                    return False
+            elif not any(needle in value for value in values[field]):
+                return False
+        return not query.terms or self.matchesTerms(rid, query)
+
+    def ridForPath(self, file_path):
+        return self.rid_by_path.get(file_path)
+
+    def snapshotState(self):
+        """可 pickle 的索引状态，不含观察者与模板原文（原文缺失时正则搜索从磁盘读取）"""
+        return {key: value for key, value in self.__dict__.items()
+                if key not in ('observers', 'contents', 'facet_totals', 'generation')}
+
+    def restoreState(self, state, contents=None):
+        """从 snapshotState 的结果恢复索引，观察者按重建处理；contents 为 {rid: 原文}"""
+        self.__dict__.update(state)
+        self.contents = contents or {}
+        self.facet_totals = None
+        self.generation += 1
+        for observer in self.observers:
+            observer.indexRebuilt(self)
+
+    def detach(self):
+        """取出当前索引状态 (state, contents) 并换成空索引，之后的重建不会改动取出的对象"""
+        state, contents = self.snapshotState(), self.contents
+        observers, generation = self.observers, self.generation
+        self.__init__()
+        self.observers, self.generation = observers, generation
+        return state, contents
+
+    def get(self, rid):
+        return self.records[rid]
+
+    def items(self):
+        """按原始顺序遍历 (rid, 记录)，字典插入顺序即 rid 升序"""
+        return self.records.items()
+
+
+class QueryResultCache:
+    """查询结果 LRU 缓存：规范化查询 -> rid 数组
+
+    每个条目记录写入时的索引代数，读取时代数不一致即视为过期并丢弃。
+    """
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, generation):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        entry_generation, rids = entry
+        if entry_generation != generation:
+            # 索引已变化，结果不可再用
+            del self.entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return rids
+
+    def put(self, key, generation, rids):
+        self.entries[key] = (generation, array('I', rids))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def hitRate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SmartCollections:
+    """保存的搜索（智能集合）：名称 -> 查询文本，成员为满足查询的 rid 集合
+
+    作为 PocIndex 的观察者，记录新增、修改、删除时逐条判断并更新成员，
+    打开集合时直接取成员，不必重新执行查询。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = OrderedDict()  # 名称 -> 查询文本
+        self.parsed = {}  # 名称 -> SearchQuery
+        self.members = {}  # 名称 -> rid 集合
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except:
+            entries = []
+        for entry in entries:
+            name = entry.get('name')
+            text = entry.get('query')
+            if name and text:
+                self.queries[name] = text
+                self.parsed[name] = parseSearchQuery(text)
+                self.members[name] = set()
+
+    def save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump([{'name': name, 'query': text} for name, text in self.queries.items()],
+                          f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存智能集合失败: {e}")
+
+    def names(self):
+        return list(self.queries)
+
+    def put(self, name, text, index):
+        """新增或覆盖集合，成员按当前索引计算一次"""
+        self.queries[name] = text
+        self.parsed[name] = parseSearchQuery(text)
+        self.members[name] = set(index.search(self.parsed[name]))
+        self.save()
+
+    def delete(self, name):
+        self.queries.pop(name, None)
+        self.parsed.pop(name, None)
+        self.members.pop(name, None)
+        self.save()
+
+    def rids(self, name):
+        return sorted(self.members.get(name, ()))
+
+    def indexRebuilt(self, index):
+        for name, query in self.parsed.items():
+            self.members[name] = set(index.search(query))
+
+    def recordAdded(self, index, rid):
+        for name, query in self.parsed.items():
+            if index.matchesQuery(rid, query):
+                self.members[name].add(rid)
+
+    def recordRemoved(self, index, rid):
+        for members in self.members.values():
+            members.discard(rid)
+
+
+QUICK_OPEN_BOUNDARY = frozenset(' /\\-_.:|')
+
+
+def fuzzyScore(pattern, text):
+    """fzf 风格打分：pattern 的字符按顺序出现在 text 中才算匹配，不匹配返回 None
+
+    先正向贪心找到最早的结束位置，再反向收紧起点得到最短窗口，
+    然后对窗口内的匹配位置计分：连续字符与单词边界加分，间隔扣分。
+    """
+    pos = text.find(pattern)
+    if pos >= 0:
+        # 连续子串是最好的情况
+        bonus = 8 if pos == 0 or text[pos - 1] in QUICK_OPEN_BOUNDARY else 0
+        return 16 * len(pattern) + bonus - min(pos, 20) * 0.1
+
+    end = -1
+    for char in pattern:
+        end = text.find(char, end + 1)
+        if end < 0:
+            return None
+    start = end + 1
+    for char in reversed(pattern):
+        start = text.rfind(char, 0, start)
+
+    score = 0.0
+    previous = start - 1
+    index = start
+    for char in pattern:
+        index = text.find(char, index)
+        if index == previous + 1:
+            score += 8
+        else:
+            score -= 3 + min(index - previous - 1, 10) * 0.5
+        if index == 0 or text[index - 1] in QUICK_OPEN_BOUNDARY:
+            score += 6
+        score += 4
+        previous = index
+        index += 1
+    return score - min(start, 20) * 0.1
+
+
+class QuickOpenIndex:
+    """快速打开（Ctrl+P）的字符三元组索引，覆盖文件名、id 与 info.name
+
+    每个三元组的倒排按稀疏度选择存储方式：出现较少时存 rid 数组，较多时存位图。
+    查询时把各三元组的位图按位切片累加，得到每条记录命中的三元组个数，
+    按命中数从高到低取候选，再用 fuzzyScore 精排；允许少量三元组缺失以容忍拼写错误。
+    """
+
+    GRAM = 3
+    CANDIDATES = 500
+
+    def __init__(self):
+        self.texts = {}  # rid -> 小写的 "文件名 | id | 名称"
+        self.sparse = {}  # 三元组 -> array('I')
+        self.dense = {}  # 三元组 -> 位图
+        self.bound = 1  # rid 上界，用于判断数组与位图哪种更省内存
+
+    @staticmethod
+    def entryText(record):
+        info = record.get('info', {}) or {}
+        return f"{record.get('original_filename', '')} | {record.get('id', '')} | {info.get('name', '')}".lower()
+
+    @classmethod
+    def grams(cls, text):
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+
+    def indexRebuilt(self, index):
+        self.texts = {rid: self.entryText(record) for rid, record in index.items()}
+        self.bound = max(index.next_rid, 1)
+        postings = {}
+        for rid, text in self.texts.items():
+            for gram in self.grams(text):
+                postings.setdefault(gram, []).append(rid)
+        self.sparse = {}
+        self.dense = {}
+        for gram, rids in postings.items():
+            if len(rids) * 32 >= self.bound:
+                self.dense[gram] = ridsToBits(rids)
+            else:
+                self.sparse[gram] = array('I', rids)
+
+    def recordAdded(self, index, rid):
+        text = self.entryText(index.get(rid))
+        self.texts[rid] = text
+        self.bound = max(self.bound, rid + 1)
+        bit = 1 << rid
+        for gram in self.grams(text):
+            if gram in self.dense:
+                self.dense[gram] |= bit
+                continue
+            rids = self.sparse.setdefault(gram, array('I'))
+            rids.append(rid)
+            if len(rids) * 32 >= self.bound:
+                self.dense[gram] = ridsToBits(rids)
+                del self.sparse[gram]
+
+    def recordRemoved(self, index, rid):
+        text = self.texts.pop(rid, None)
+        if text is None:
+            return
+        mask = ~(1 << rid)
+        for gram in self.grams(text):
+            if gram in self.dense:
+                self.dense[gram] &= mask
+            else:
+                rids = self.sparse.get(gram)
+                if rids is not None and rid in rids:
+                    rids.remove(rid)
+                    if not rids:
+                        del self.sparse[gram]
+
+    def gramBits(self, gram):
+        bits = self.dense.get(gram)
+        if bits is not None:
+            return bits
+        return ridsToBits(self.sparse.get(gram, ()))
+
+    def candidates(self, grams, min_hits):
+        """返回 [(rid, 命中数)]，按命中数从高到低，最多 CANDIDATES 个"""
+        # 位切片计数器：counters[i] 是各记录命中数的第 i 位
+        counters = []
+        for gram in grams:
+            carry = self.gramBits(gram)
+            for i, counter in enumerate(counters):
+                if not carry:
+                    break
+                counters[i], carry = counter ^ carry, counter & carry
+            if carry:
+                counters.append(carry)
+
+        def atLeast(level):
+            greater = 0
+            equal = -1
+            for i in range(len(counters) - 1, -1, -1):
+                if (level >> i) & 1:
+                    equal &= counters[i]
+                else:
+                    greater |= equal & counters[i]
+                    equal &= ~counters[i]
+            if level >> len(counters):
+                return 0
+            return greater | equal
+
+        results = []
+        higher = 0
+        for level in range(len(grams), min_hits - 1, -1):
+            bits = atLeast(level)
+            for rid in bitsToRids(bits & ~higher, self.CANDIDATES - len(results)):
+                results.append((rid, level))
+            if len(results) >= self.CANDIDATES:
+                break
+            higher = bits
+        return results
+
+    def search(self, text, limit=50):
+        """返回 [(rid, 分数)]，按分数降序"""
+        words = text.lower().split()
+        if not words:
+            return []
+        grams = set()
+        for word in words:
+            grams |= self.grams(word)
+
+        if grams:
+            # 每处拼写错误最多破坏 3 个三元组，字符对调相当于两处错误
+            typos = 0 if len(grams) < 2 else 1 if len(grams) < 4 else 2
+            candidates = self.candidates(grams, max(1, len(grams) - 3 * typos))
+        else:
+            # 查询太短，没有三元组可用，顺序扫描到候选数上限为止
+            candidates = []
+            for rid, entry in self.texts.items():
+                if all(word in entry for word in words):
+                    candidates.append((rid, 0))
+                    if len(candidates) >= self.CANDIDATES:
+                        break
+
+        scored = []
+        for rid, hits in candidates:
+            entry = self.texts[rid]
+            score = 0.0
+            for word in words:
+                word_score = fuzzyScore(word, entry)
+                if word_score is None:
+                    # 拼写错误：只按三元组命中数给一个较低的分
+                    word_score = -40.0
+                score += word_score
+            scored.append((score + hits, -rid))
+        return [(-neg_rid, score) for score, neg_rid in heapq.nlargest(limit, scored)]
+
+
+class TermDictionary:
+    """搜索补全词典：危害、标签、作者、CVE 编号与模板 id，各自一个有序数组并记录文档频率
+
+    前缀查找用 bisect 定位区间；区间较大时按块（每块 BLOCK 个词）的最大频率做最优优先展开，
+    只需访问少量块即可取出频率最高的前 k 个词。
+    """
+
+    KINDS = ('severity', 'tag', 'author', 'cve', 'id')
+    FIELD_PREFIXES = {'severity': 'severity:', 'tag': 'tag:', 'author': 'author:', 'cve': '', 'id': ''}
+    BLOCK = 64
+
+    def __init__(self):
+        self.terms = {kind: [] for kind in self.KINDS}  # 有序词数组
+        self.df = {kind: {} for kind in self.KINDS}  # 词 -> 文档频率
+        self.block_max = {kind: None for kind in self.KINDS}  # 每块最大频率，None 表示需要重算
+        self.record_terms = {}  # rid -> [(类别, 词)]，删除时据此扣减频率
+
+    @staticmethod
+    def recordTerms(index, rid):
+        values = index.fields[rid]
+        record = index.get(rid)
+        terms = set()
+        for kind in ('severity', 'tag', 'author'):
+            terms.update((kind, value) for value in values[kind])
+        classification = (record.get('info', {}) or {}).get('classification', {}) or {}
+        template_id = str(record.get('id', '') or '').strip().lower()
+        for match in CVE_ID_PATTERN.finditer(f"{classification.get('cve-id') or ''} {template_id}"):
+            terms.add(('cve', match.group(0).lower()))
+        if template_id and not CVE_ID_PATTERN.fullmatch(template_id):
+            terms.add(('id', template_id))
+        return list(terms)
+
+    def indexRebuilt(self, index):
+        self.record_terms = {rid: self.recordTerms(index, rid) for rid in index.records}
+        self.df = {kind: {} for kind in self.KINDS}
+        for terms in self.record_terms.values():
+            for kind, term in terms:
+                counts = self.df[kind]
+                counts[term] = counts.get(term, 0) + 1
+        self.terms = {kind: sorted(counts) for kind, counts in self.df.items()}
+        self.block_max = {kind: None for kind in self.KINDS}
+
+    def recordAdded(self, index, rid):
+        terms = self.recordTerms(index, rid)
+        self.record_terms[rid] = terms
+        for kind, term in terms:
+            counts = self.df[kind]
+            if term not in counts:
+                bisect.insort(self.terms[kind], term)
+            counts[term] = counts.get(term, 0) + 1
+            self.block_max[kind] = None
+
+    def recordRemoved(self, index, rid):
+        for kind, term in self.record_terms.pop(rid, ()):
+            counts = self.df[kind]
+            counts[term] -= 1
+            if not counts[term]:
+                del counts[term]
+                terms = self.terms[kind]
+                del terms[bisect.bisect_left(terms, term)]
+            self.block_max[kind] = None
+
+    def blockMaxima(self, kind):
+        maxima = self.block_max[kind]
+        if maxima is None:
+            terms = self.terms[kind]
+            counts = self.df[kind]
+            maxima = [max(counts[term] for term in terms[i:i + self.BLOCK])
+                      for i in range(0, len(terms), self.BLOCK)]
+            self.block_max[kind] = maxima
+        return maxima
+
+    def topK(self, kind, prefix, k):
+        """返回以 prefix 开头、频率最高的 k 个 (频率, 词)，频率相同按字典序"""
+        terms = self.terms[kind]
+        counts = self.df[kind]
+        lo = bisect.bisect_left(terms, prefix)
+        hi = bisect.bisect_left(terms, prefix + '\uffff')
+        if hi - lo <= 4 * self.BLOCK:
+            return [(-neg, term) for neg, term in heapq.nsmallest(k, ((-counts[t], t) for t in terms[lo:hi]))]
+
+        # 区间两端不完整的块逐个放入，中间完整的块按块最大频率放入，键为 (-频率, 首词)
+        maxima = self.blockMaxima(kind)
+        first_block = -(-lo // self.BLOCK)
+        last_block = hi // self.BLOCK
+        heap = [(-counts[t], t, 1, 0) for t in terms[lo:first_block * self.BLOCK]]
+        heap.extend((-counts[t], t, 1, 0) for t in terms[last_block * self.BLOCK:hi])
+        heap.extend((-maxima[b], terms[b * self.BLOCK], 0, b) for b in range(first_block, last_block))
+        heapq.heapify(heap)
+        results = []
+        while heap and len(results) < k:
+            neg, term, is_term, block = heapq.heappop(heap)
+            if is_term:
+                results.append((-neg, term))
+                continue
+            start = block * self.BLOCK
+            for t in terms[start:start + self.BLOCK]:
+                heapq.heappush(heap, (-counts[t], t, 1, 0))
+        return results
+
+    def complete(self, token, limit=20):
+        """按频率排序的补全列表；token 带 tag:/author:/severity: 前缀时只查该类"""
+        token = token.lower()
+        field, sep, value = token.partition(':')
+        if sep and field in ('severity', 'tag', 'author'):
+            kinds = (field,)
+            prefix = value
+        elif sep:
+            return []
+        else:
+            kinds = self.KINDS
+            prefix = token
+        if not prefix and len(kinds) > 1:
+            return []
+        completions = []
+        if not sep:
+            completions = [f'{name}:' for name in ('severity', 'tag', 'author', 'protocol')
+                           if name.startswith(prefix) and name != prefix]
+        candidates = []
+        for kind in kinds:
+            candidates.extend((-df, term, kind) for df, term in self.topK(kind, prefix, limit))
+        for _, term, kind in heapq.nsmallest(limit - len(completions), candidates):
+            if ' ' in term or '"' in term:
+                term = f'"{term}"'
+            completions.append(self.FIELD_PREFIXES[kind] + term)
+        return completions
+
+
+SEVERITY_RANKS = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3, 'info': 4}
+
+
+class SortKeyIndex:
+    """表格排序用的预计算排序键与排列缓存
+
+    加载时为每条记录计算各排序字段的类型化键（危害等级、CVE 年份与序号、作者、路径、CVSS），
+    全库升序、降序的 rid 排列在首次使用时生成，之后的排序只需按当前结果集过滤缓存的排列；
+    记录增删时用二分查找就地插入或删除，不必重新排序。
+    排序是稳定的，键相同的记录保持原始顺序；缺少取值的记录无论升序降序都排在最后。
+    """
+
+    FIELDS = ('raw', 'path', 'severity', 'author', 'cve', 'cvss')
+
+    def __init__(self):
+        self.keys = {field: {} for field in self.FIELDS}  # 字段 -> {rid: 键}，缺失取值的 rid 不在其中
+        self.permutations = {}  # (字段, 是否降序) -> (有键的 rid 排列, 无键的 rid 列表)
+        self.all_rids = []
+        self.size = 0
+
+    @staticmethod
+    def recordKeys(rid, record, values):
+        info = record.get('info', {}) or {}
+        classification = info.get('classification', {}) or {}
+        keys = {'raw': rid, 'path': str(record.get('original_filename', '') or '').lower()}
+        if values['severity']:
+            keys['severity'] = SEVERITY_RANKS.get(values['severity'][0], len(SEVERITY_RANKS))
+        author = ', '.join(values['author'])
+        if author:
+            keys['author'] = author
+        cve_id = classification.get('cve-id') or ''
+        if isinstance(cve_id, list):
+            cve_id = cve_id[0] if cve_id else ''
+        match = CVE_ID_PATTERN.search(str(cve_id))
+        if match:
+            keys['cve'] = (int(match.group(1)), int(match.group(2)))
+        if values['cvss'] is not None:
+            keys['cvss'] = values['cvss']
+        return keys
+
+    def indexRebuilt(self, index):
+        self.keys = {field: {} for field in self.FIELDS}
+        for rid, record in index.items():
+            self.storeKeys(rid, self.recordKeys(rid, record, index.fields[rid]))
+        self.all_rids = list(index.records)  # rid 升序
+        self.size = index.next_rid
+        self.permutations = {}  # 首次按该字段排序时生成
+
+    def storeKeys(self, rid, keys):
+        for field, key in keys.items():
+            self.keys[field][rid] = key
+
+    def recordAdded(self, index, rid):
+        keys = self.recordKeys(rid, index.get(rid), index.fields[rid])
+        self.storeKeys(rid, keys)
+        bisect.insort(self.all_rids, rid)
+        self.size = index.next_rid
+        for (field, descending), (present, missing) in self.permutations.items():
+            if field in keys:
+                present.insert(self.permutationPosition(present, field, descending, rid), rid)
+            else:
+                bisect.insort(missing, rid)
+
+    def recordRemoved(self, index, rid):
+        self.discard(self.all_rids, rid)
+        for (field, descending), (present, missing) in self.permutations.items():
+            if rid in self.keys[field]:
+                position = self.permutationPosition(present, field, descending, rid)
+                if position < len(present) and present[position] == rid:
+                    del present[position]
+            else:
+                self.discard(missing, rid)
+        for keys in self.keys.values():
+            keys.pop(rid, None)
+
+    @staticmethod
+    def discard(rids, rid):
+        """从升序的 rid 列表中删除 rid"""
+        position = bisect.bisect_left(rids, rid)
+        if position < len(rids) and rids[position] == rid:
+            del rids[position]
+
+    def permutationPosition(self, present, field, descending, rid):
+        """rid 在排列中的位置（不在其中时为插入位置）：按 (键, rid) 二分，降序时键反向、同键仍按 rid 升序"""
+        keys = self.keys[field]
+        key = keys[rid]
+        low, high = 0, len(present)
+        while low < high:
+            middle = (low + high) // 2
+            other = present[middle]
+            other_key = keys[other]
+            if other_key == key:
+                before = other < rid
+            else:
+                before = other_key > key if descending else other_key < key
+            if before:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def permutation(self, field, descending):
+        cached = self.permutations.get((field, descending))
+        if cached is None:
+            keys = self.keys[field]
+            present = array('I', sorted((rid for rid in self.all_rids if rid in keys),
+                                        key=keys.__getitem__, reverse=descending))
+            missing = [rid for rid in self.all_rids if rid not in keys]
+            cached = (present, missing)
+            self.permutations[(field, descending)] = cached
+        return cached
+
+    def sortedRids(self, field, rids=None, descending=False):
+        """按字段排序结果集；rids 为 None 表示全库"""
+        keys = self.keys[field]
+        if rids is None:
+            present, missing = self.permutation(field, descending)
+            return present.tolist() + missing
+        if len(rids) * max(1, len(rids).bit_length()) < self.size:
+            # 结果集很小时直接对其排序，比过滤全库排列更快（rids 为原始顺序，稳定排序保证同键顺序）
+            present = sorted((rid for rid in rids if rid in keys), key=keys.__getitem__, reverse=descending)
+            return present + [rid for rid in rids if rid not in keys]
+        ordered, ordered_missing = self.permutation(field, descending)
+        mask = bytearray(self.size)
+        for rid in rids:
+            mask[rid] = 1
+        return [rid for rid in ordered if mask[rid]] + [rid for rid in ordered_missing if mask[rid]]
+
+
+class RankedCounter:
+    """按计数分桶的计数器：增减一次只移动一个取值，取前 k 名时从最大的桶往下取，不需要排序全部取值"""
+
+    def __init__(self):
+        self.counts = {}  # 取值 -> 计数
+        self.buckets = {}  # 计数 -> {取值: None}
+        self.levels = []  # 非空桶的计数，升序
+
+    def rebuild(self, counts):
+        self.counts = {}
+        self.buckets = {}
+        self.levels = []
+        for value, count in counts.items():
+            if count > 0:
+                self.counts[value] = count
+                self.buckets.setdefault(count, {})[value] = None
+        self.levels = sorted(self.buckets)
+
+    def add(self, value, delta=1):
+        old = self.counts.get(value, 0)
+        new = old + delta
+        if old:
+            bucket = self.buckets[old]
+            del bucket[value]
+            if not bucket:
+                del self.buckets[old]
+                del self.levels[bisect.bisect_left(self.levels, old)]
+        if new > 0:
+            self.counts[value] = new
+            bucket = self.buckets.get(new)
+            if bucket is None:
+                bucket = self.buckets[new] = {}
+                bisect.insort(self.levels, new)
+            bucket[value] = None
+        else:
+            self.counts.pop(value, None)
+
+    def top(self, limit=None):
+        """计数最高的 limit 个 (取值, 计数)，计数相同时按取值排序"""
+        result = []
+        for count in reversed(self.levels):
+            bucket = self.buckets[count]
+            if limit is not None and len(bucket) > limit - len(result):
+                values = heapq.nsmallest(limit - len(result), bucket)
+            else:
+                values = sorted(bucket)
+            result.extend((value, count) for value in values)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class CorpusStats:
+    """模板库统计：按危害、协议、CVE 年份、作者、标签计数
+
+    作为 PocIndex 的观察者，加载时一次性计数，保存与删除只增减受影响记录的取值，
+    面板刷新与导出都不需要遍历 yaml_data。baseline 为该目录上次加载时的摘要，用于计算增长。
+    """
+
+    FIELDS = ('severity', 'protocol', 'year', 'author', 'tag')
+    TOP_LIMIT = 20
+
+    def __init__(self):
+        self.counters = {field: RankedCounter() for field in self.FIELDS}
+        self.total = 0
+        self.baseline = None  # {'time': ..., 'total': ..., 'severity': {...}}
+        self.version = 0
+        self.cached = None  # (version, snapshot)
+
+    @staticmethod
+    def recordValues(values):
+        """(字段, 取值) 序列，取自 PocIndex.fields 中已提取的字段"""
+        for field in ('severity', 'protocol', 'author', 'tag'):
+            for value in values[field]:
+                yield field, value
+        if values['year'] is not None:
+            yield 'year', str(int(values['year']))
+
+    def indexRebuilt(self, index):
+        counts = {field: {} for field in self.FIELDS}
+        for values in index.fields.values():
+            for field, value in self.recordValues(values):
+                counts[field][value] = counts[field].get(value, 0) + 1
+        for field, counter in self.counters.items():
+            counter.rebuild(counts[field])
+        self.total = len(index.records)
+        self.version += 1
+
+    def recordAdded(self, index, rid):
+        self.apply(index.fields[rid], 1)
+
+    def recordRemoved(self, index, rid):
+        values = index.fields.get(rid)
+        if values is not None:
+            self.apply(values, -1)
+
+    def apply(self, values, delta):
+        for field, value in self.recordValues(values):
+            self.counters[field].add(value, delta)
+        self.total += delta
+        self.version += 1
+
+    def setBaseline(self, baseline):
+        self.baseline = baseline
+        self.version += 1
+
+    def summary(self):
+        """持久化用的摘要，下次加载同一目录时作为增长的基准"""
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total': self.total,
+            'severity': dict(self.counters['severity'].counts),
+        }
+
+    def growth(self):
+        if not self.baseline:
+            return None
+        old = self.baseline.get('severity', {})
+        current = self.counters['severity'].counts
+        return {
+            'since': self.baseline.get('time', ''),
+            'total': self.total - self.baseline.get('total', 0),
+            'severity': {value: current.get(value, 0) - old.get(value, 0)
+                         for value in sorted(set(old) | set(current),
+                                             key=lambda value: (SEVERITY_RANKS.get(value, len(SEVERITY_RANKS)), value))
+                         if current.get(value, 0) != old.get(value, 0)},
+        }
+
+    def snapshot(self):
+        """面板展示用的统计，计数未变化时直接返回缓存"""
+        if self.cached is not None and self.cached[0] == self.version:
+            return self.cached[1]
+        counters = self.counters
+        snapshot = {
+            'total': self.total,
+            'severity': sorted(counters['severity'].counts.items(),
+                               key=lambda item: (SEVERITY_RANKS.get(item[0], len(SEVERITY_RANKS)), item[0])),
+            'protocol': counters['protocol'].top(),
+            'year': sorted(counters['year'].counts.items(), reverse=True),
+            'author': counters['author'].top(self.TOP_LIMIT),
+            'tag': counters['tag'].top(self.TOP_LIMIT),
+            'author_count': len(counters['author']),
+            'tag_count': len(counters['tag']),
+            'growth': self.growth(),
+        }
+        self.cached = (self.version, snapshot)
+        return snapshot
+
+    def exportData(self, folder=None):
+        """导出 JSON 用的完整统计（作者与标签不截断）"""
+        snapshot = self.snapshot()
+        return {
+            'folder': folder,
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total': self.total,
+            'severity': dict(snapshot['severity']),
+            'protocol': dict(snapshot['protocol']),
+            'year': dict(snapshot['year']),
+            'author': dict(self.counters['author'].top()),
+            'tag': dict(self.counters['tag'].top()),
+            'growth': snapshot['growth'],
+        }
+
+
+class QuickOpenDialog(QDialog):
+    """Ctrl+P 快速打开：输入时实时模糊匹配模板文件名、id 与名称"""
+
+    def __init__(self, quick_index, records, parent=None):
+        super().__init__(parent, Qt.Popup | Qt.FramelessWindowHint)
+        self.quick_index = quick_index
+        self.records = records
+        self.rid = None
+        self.setMinimumWidth(720)
+        self.setMinimumHeight(420)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("输入文件名、模板 id 或名称（支持模糊匹配）")
+        self.input.textChanged.connect(self.updateResults)
+        self.input.installEventFilter(self)
+        layout.addWidget(self.input)
+
+        self.list_widget = QListWidget()
+        self.list_widget.itemActivated.connect(self.acceptItem)
+        layout.addWidget(self.list_widget)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+    def updateResults(self, text):
+        started = time.perf_counter()
+        results = self.quick_index.search(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.list_widget.clear()
+        for rid, _ in results:
+            record = self.records[rid]
+            name = (record.get('info', {}) or {}).get('name', '')
+            item = QListWidgetItem(f"{record.get('original_filename', '')}    {record.get('id', '')}    {name}")
+            item.setData(Qt.UserRole, rid)
+            self.list_widget.addItem(item)
+        if results:
+            self.list_widget.setCurrentRow(0)
+        self.status_label.setText(f"{len(results)} 个结果，耗时 {elapsed_ms:.1f} ms" if text.strip() else "")
+
+    def eventFilter(self, obj, event):
+        # 焦点留在输入框时，用方向键移动结果列表的选中项
+        if obj is self.input and event.type() == QEvent.KeyPress:
+            if event.key() in (Qt.Key_Down, Qt.Key_Up, Qt.Key_PageDown, Qt.Key_PageUp):
+                QApplication.sendEvent(self.list_widget, event)
+                return True
+            if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+                self.acceptItem(self.list_widget.currentItem())
+                return True
+        return super().eventFilter(obj, event)
+
+    def acceptItem(self, item):
+        if item is None:
+            return
+        self.rid = item.data(Qt.UserRole)
+        self.accept()
+
+
+class FacetPanel(QTreeWidget):
+    """分面统计侧栏：显示当前结果集按危害、标签、作者、协议的数量，点击取值细化查询"""
+    facetClicked = pyqtSignal(str, str)
+
+    FACET_TITLES = [('severity', '危害'), ('tag', '标签'), ('author', '作者'), ('protocol', '协议')]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setColumnCount(2)
+        self.setHeaderLabels(['分面', '数量'])
+        self.setRootIsDecorated(True)
+        self.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.header().setStretchLastSection(False)
+        self.itemClicked.connect(self.onItemClicked)
+        self.groups = {}
+        for field, title in self.FACET_TITLES:
+            group = QTreeWidgetItem(self, [title, ''])
+            group.setExpanded(True)
+            self.groups[field] = group
+
+    def setCounts(self, counts):
+        self.setUpdatesEnabled(False)
+        for field, group in self.groups.items():
+            group.takeChildren()
+            values = counts.get(field, [])
+            group.setText(1, str(len(values)) if values else '')
+            for value, count in values:
+                child = QTreeWidgetItem(group, [value, str(count)])
+                child.setData(0, Qt.UserRole, field)
+                child.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+        self.setUpdatesEnabled(True)
+
+    def onItemClicked(self, item, column):
+        field = item.data(0, Qt.UserRole)
+        if field:
+            self.facetClicked.emit(field, item.text(0))
+
+
+class SimilarTemplatesDialog(QDialog):
+    """相似模板结果对话框"""
+
+    def __init__(self, results, records, elapsed_ms, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"相似模板 (耗时 {elapsed_ms:.1f} ms)")
+        self.setMinimumWidth(600)
+        self.setMinimumHeight(400)
+        self.rids = [rid for rid, _ in results]
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("按余弦相似度排序:"))
+
+        self.list_widget = QListWidget()
+        for rid, score in results:
+            record = records[rid]
+            name = (record.get('info', {}) or {}).get('name', '')
+            self.list_widget.addItem(f"{score:.3f}    {record.get('original_filename', '')}    {name}")
+        layout.addWidget(self.list_widget)
+
+        button_box = QDialogButtonBox()
+        show_btn = button_box.addButton("在表格中显示", QDialogButtonBox.AcceptRole)
+        button_box.addButton("关闭", QDialogButtonBox.RejectRole)
+        show_btn.setEnabled(bool(self.rids))
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+
+class DebugPanel(QDockWidget):
+    """调试面板，显示查询缓存命中率等内部统计 (F12 切换)"""
+
+    def __init__(self, parent=None):
+        super().__init__("调试信息", parent)
+        self.setObjectName("debug_panel")
+        self.stats_label = QLabel()
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.stats_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.stats_label.setStyleSheet("QLabel { font-family: 'Courier New'; padding: 5px; }")
+        self.setWidget(self.stats_label)
+
+    def refresh(self, cache, generation):
+        lines = [
+            f"索引代数: {generation}",
+            f"缓存条目: {len(cache.entries)} / {cache.capacity}",
+            f"命中: {cache.hits}  未命中: {cache.misses}  过期: {cache.stale}",
+            f"命中率: {cache.hitRate() * 100:.1f}%",
+        ]
+        self.stats_label.setText("\n".join(lines))
+
+
+class StatsPanel(QDockWidget):
+    """模板库统计面板 (F10 切换)：危害、协议、年份、作者与标签分布，以及相对上次加载的增长"""
+    exportRequested = pyqtSignal()
+
+    GROUPS = [('severity', '危害'), ('protocol', '协议'), ('year', 'CVE 年份'), ('author', '作者'), ('tag', '标签')]
+
+    def __init__(self, parent=None):
+        super().__init__("模板统计", parent)
+        self.setObjectName("stats_panel")
+        self.shown_version = None
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(5, 5, 5, 5)
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.summary_label)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(2)
+        self.tree.setHeaderLabels(['分类', '数量'])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.tree.header().setStretchLastSection(False)
+        layout.addWidget(self.tree)
+
+        export_button = QPushButton("导出 JSON")
+        export_button.clicked.connect(self.exportRequested.emit)
+        layout.addWidget(export_button)
+        self.setWidget(container)
+
+    def refresh(self, stats):
+        """统计未变化时不重绘"""
+        if stats.version == self.shown_version:
+            return
+        self.shown_version = stats.version
+        snapshot = stats.snapshot()
+
+        lines = [f"模板总数: {snapshot['total']}    作者: {snapshot['author_count']}    标签: {snapshot['tag_count']}"]
+        growth = snapshot['growth']
+        if growth is None:
+            lines.append("增长: 首次加载该目录，暂无对比")
+        else:
+            changes = '  '.join(f"{value or '未设置'} {delta:+d}" for value, delta in growth['severity'].items())
+            lines.append(f"自上次加载 ({growth['since']}) 以来: {growth['total']:+d}" + (f"    {changes}" if changes else ''))
+        self.summary_label.setText("\n".join(lines))
+
+        expanded = {self.tree.topLevelItem(i).data(0, Qt.UserRole): self.tree.topLevelItem(i).isExpanded()
+                    for i in range(self.tree.topLevelItemCount())}
+        self.tree.setUpdatesEnabled(False)
+        self.tree.clear()
+        for field, title in self.GROUPS:
+            values = snapshot[field]
+            if field in ('author', 'tag'):
+                title = f"{title} (前 {len(values)})"
+            group = QTreeWidgetItem(self.tree, [title, ''])
+            group.setData(0, Qt.UserRole, field)
+            for value, count in values:
+                child = QTreeWidgetItem(group, [value, str(count)])
+                child.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+            group.setExpanded(expanded.get(field, field in ('severity', 'protocol')))
+        self.tree.setUpdatesEnabled(True)
+
+
+def templateMetadata(data):
+    """提取表格展示用的元数据列（均为字符串）"""
+    info = data.get('info', {}) or {}
+    tags = info.get('tags', [])
+    if isinstance(tags, list):
+        tags = ', '.join(str(tag) for tag in tags)
+    reference = info.get('reference', [])
+    if isinstance(reference, list):
+        reference = reference[0] if reference else ''
+    classification = info.get('classification', {}) or {}
+    return (
+        str(data.get('id', '') or ''),
+        str(info.get('name', '') or ''),
+        str(info.get('severity', '') or ''),
+        str(info.get('author', '') or ''),
+        str(tags or ''),
+        str(classification.get('cve-id', '') or ''),
+        str(reference or ''),
+        str(info.get('description', '') or ''),
+        str(classification.get('cvss-score', '') or ''),
+    )
+
+
+class SqlitePocStore:
+    """可选的 SQLite 持久化索引
+
+    元数据列存放在普通表 templates 中，原始内容存放在 FTS5 虚拟表 templates_fts 中
+    （rowid 与 templates.rid 一致）。多个根目录共用一个数据库，按 root 列区分。
+    搜索由 FTS5 回答，表格滚动到哪一块再按 LIMIT/OFFSET 取行，无需在 Python 中持有全部 yaml_data。
+    """
+
+    META_COLUMNS = ('tid', 'name', 'severity', 'author', 'tags', 'cve', 'reference', 'description', 'cvss')
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = self.connect(db_path)
+        self.trigram = self.createSchema(self.conn)
+
+    @staticmethod
+    def connect(db_path):
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def createSchema(conn):
+        """建表，返回 FTS5 是否使用 trigram 分词（支持子串匹配）"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS templates (
+                rid INTEGER PRIMARY KEY,
+                root TEXT NOT NULL,
+                path TEXT NOT NULL UNIQUE,
+                rel TEXT NOT NULL,
+                mtime REAL,
+                size INTEGER,
+                tid TEXT, name TEXT, severity TEXT, author TEXT,
+                tags TEXT, cve TEXT, reference TEXT, description TEXT, cvss TEXT
+            )
+        """)
+        if 'cvss' not in [row[1] for row in conn.execute("PRAGMA table_info(templates)")]:
+            # 旧数据库没有 cvss 列：补上该列并清空 mtime，下次同步时重新写入全部模板
+            conn.execute("ALTER TABLE templates ADD COLUMN cvss TEXT")
+            conn.execute("UPDATE templates SET mtime = NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS templates_root ON templates(root, rid)")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS templates_fts USING fts5(content, tokenize='trigram')")
+            trigram = True
+        except sqlite3.OperationalError:
+            # 旧版本 SQLite 不支持 trigram 分词，退回默认分词并全部使用 LIKE 匹配
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS templates_fts USING fts5(content)")
+            trigram = False
+        conn.commit()
+        return trigram
+
+    @staticmethod
+    def fileStates(conn, root):
+        """返回 {path: (rid, mtime, size)}，供增量同步比对"""
+        rows = conn.execute("SELECT path, rid, mtime, size FROM templates WHERE root = ?", (root,))
+        return {path: (rid, mtime, size) for path, rid, mtime, size in rows}
+
+    @staticmethod
+    def writeFile(conn, root, file_path, content, data, rid=None, stat=None):
+        """插入或更新一个模板文件的元数据与原始内容"""
+        if stat is None:
+            stat = os.stat(file_path)
+        rel = os.path.relpath(file_path, root)
+        values = (root, file_path, rel, stat.st_mtime, stat.st_size) + templateMetadata(data)
+        if rid is None:
+            row = conn.execute("SELECT rid FROM templates WHERE path = ?", (file_path,)).fetchone()
+            rid = row[0] if row else None
+        if rid is None:
+            cursor = conn.execute(
+                "INSERT INTO templates (root, path, rel, mtime, size, tid, name, severity, author, "
+                "tags, cve, reference, description, cvss) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            rid = cursor.lastrowid
+        else:
+            conn.execute(
+                "UPDATE templates SET root = ?, path = ?, rel = ?, mtime = ?, size = ?, tid = ?, name = ?, "
+                "severity = ?, author = ?, tags = ?, cve = ?, reference = ?, description = ?, cvss = ? WHERE rid = ?",
+                values + (rid,))
+            conn.execute("DELETE FROM templates_fts WHERE rowid = ?", (rid,))
+        conn.execute("INSERT INTO templates_fts (rowid, content) VALUES (?, ?)", (rid, content))
+        return rid
+
+    @staticmethod
+    def deleteRids(conn, rids):
+        for rid in rids:
+            conn.execute("DELETE FROM templates WHERE rid = ?", (rid,))
+            conn.execute("DELETE FROM templates_fts WHERE rowid = ?", (rid,))
+
+    def upsertFile(self, root, file_path, content, data):
+        self.writeFile(self.conn, root, file_path, content, data)
+        self.conn.commit()
+
+    def removePath(self, file_path):
+        row = self.conn.execute("SELECT rid FROM templates WHERE path = ?", (file_path,)).fetchone()
+        if row:
+            self.deleteRids(self.conn, [row[0]])
+            self.conn.commit()
+
+    def whereClause(self, root, query):
+        """把规范化查询 (操作符, 关键词) 转换为 WHERE 子句和参数"""
+        params = [root]
+        where = "root = ?"
+        operator, keywords = query
+        clauses = []
+        for kw in keywords:
+            if self.trigram and len(kw) >= 3:
+                clauses.append("rid IN (SELECT rowid FROM templates_fts WHERE templates_fts MATCH ?)")
+                params.append('"' + kw.replace('"', '""') + '"')
+            else:
+                # trigram 无法处理少于 3 个字符的关键词
+                clauses.append("rid IN (SELECT rowid FROM templates_fts WHERE content LIKE ? ESCAPE '\\')")
+                escaped = kw.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(f"%{escaped}%")
+        if clauses:
+            joiner = " AND " if operator == 'AND' else " OR "
+            where += " AND (" + joiner.join(clauses) + ")"
+        return where, params
+
+    def count(self, root, query=('OR', ())):
+        where, params = self.whereClause(root, query)
+        return self.conn.execute(f"SELECT COUNT(*) FROM templates WHERE {where}", params).fetchone()[0]
+
+    def page(self, root, query, offset, limit):
+        """按 rid 顺序返回一页记录，记录结构与 LoadPOCThread 加载的数据一致"""
+        where, params = self.whereClause(root, query)
+        rows = self.conn.execute(
+            f"SELECT path, rel, {', '.join(self.META_COLUMNS)} FROM templates "
+            f"WHERE {where} ORDER BY rid LIMIT ? OFFSET ?", params + [limit, offset])
+        return [self.rowToRecord(row) for row in rows]
+
+    @classmethod
+    def iterRecords(cls, conn, where, params):
+        """按 rid 顺序逐行产出记录，游标边读边产出，不一次取回整个结果集"""
+        rows = conn.execute(
+            f"SELECT path, rel, {', '.join(cls.META_COLUMNS)} FROM templates WHERE {where} ORDER BY rid", params)
+        for row in rows:
+            yield cls.rowToRecord(row)
+
+    def relativePaths(self, root, query):
+        where, params = self.whereClause(root, query)
+        rows = self.conn.execute(f"SELECT rel FROM templates WHERE {where} ORDER BY rid", params)
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def rowToRecord(row):
+        path, rel, tid, name, severity, author, tags, cve, reference, description, cvss = row
+        return {
+            'id': tid,
+            'info': {
+                'name': name,
+                'severity': severity,
+                'author': author,
+                'tags': tags,
+                'reference': [reference] if reference else [],
+                'classification': {'cve-id': cve, 'cvss-score': cvss},
+                'description': description,
+            },
+            'original_filename': rel,
+            'file_path': path,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+class SqliteSyncThread(QThread):
+    """把目录增量同步到 SQLite 索引：只解析新增或修改过的文件"""
+    finished = pyqtSignal(int)  # 同步后的模板总数
+    progress = pyqtSignal(int)
+
+    def __init__(self, db_path, folder_path):
+        super().__init__()
+        self.db_path = db_path
+        self.folder_path = folder_path
+
+    def run(self):
+        conn = SqlitePocStore.connect(self.db_path)
+        total = 0
+        try:
+            known = SqlitePocStore.fileStates(conn, self.folder_path)
+            file_paths = []
+            for root, _, files in os.walk(self.folder_path):
+                file_paths.extend(os.path.join(root, file) for file in files if file.lower().endswith('.yaml'))
+
+            seen = set()
+            for processed, file_path in enumerate(file_paths, 1):
+                try:
+                    stat = os.stat(file_path)
+                    state = known.get(file_path)
+                    if state and state[1] == stat.st_mtime and state[2] == stat.st_size:
+                        seen.add(file_path)  # 未修改，跳过解析
+                    else:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                        data = yaml.safe_load(content)
+                        if isinstance(data, dict):
+                            SqlitePocStore.writeFile(conn, self.folder_path, file_path, content, data,
+                                                     rid=state[0] if state else None, stat=stat)
+                            seen.add(file_path)
+                except Exception as e:
+                    print(f"加载文件出错 {file_path}: {str(e)}")
+
+                if processed % 500 == 0:
+                    conn.commit()
+                self.progress.emit(int(processed / len(file_paths) * 100))
+
+            # 删除磁盘上已不存在（或已无法解析）的文件
+            SqlitePocStore.deleteRids(conn, [state[0] for path, state in known.items() if path not in seen])
+            conn.commit()
+            total = len(seen)
+        except Exception as e:
+            print(f"同步 SQLite 索引失败: {str(e)}")
+        finally:
+            conn.close()
+
+        self.finished.emit(total)
+
+
+class ExportResultsThread(QThread):
+    """把当前结果集流式导出为 CSV、JSONL 或 Markdown
+
+    记录由生成器逐条产出（内存模式按 rid 逐条取，SQLite 模式由独立连接的游标逐行读），
+    经缓冲写入文件，内存占用与结果集大小无关。先写同目录下的临时文件，完整写完才替换目标文件，
+    取消或出错时删除临时文件，不会留下截断的导出结果。
+    """
+    progress = pyqtSignal(int)
+    exportFinished = pyqtSignal(int, str)  # (写出的行数, 错误信息，成功时为空)
+
+    FORMATS = {'csv': 'CSV 文件 (*.csv)', 'jsonl': 'JSON Lines (*.jsonl)', 'md': 'Markdown (*.md)'}
+    JSON_KEYS = ('index', 'file', 'severity', 'author', 'tags', 'cve', 'cvss', 'reference', 'description', 'path')
+    BUFFER_SIZE = 1 << 16
+
+    def __init__(self, file_path, fmt, total, records):
+        """records 为无参可调用对象，在工作线程中调用并返回记录迭代器"""
+        super().__init__()
+        self.file_path = file_path
+        self.fmt = fmt
+        self.total = total
+        self.records = records
+        self.cancelled = False
+        self.interrupted = False  # 是否因取消而没有写完（进度对话框自动关闭时也会发出取消信号）
+
+    def cancel(self):
+        self.cancelled = True
+
+    def rows(self):
+        """(序号, 各列展示值..., 危害等级, 完整路径) 生成器"""
+        for number, record in enumerate(self.records(), 1):
+            yield (str(number),) + PocTableModel.recordValues(record) + (str(record.get('file_path', '') or ''),)
+
+    @staticmethod
+    def markdownCell(value):
+        return value.replace('\\', '\\\\').replace('|', '\\|').replace('\r', ' ').replace('\n', ' ')
+
+    def run(self):
+        count = 0
+        error = ''
+        headers = PocTableModel.HEADERS + ['完整路径']
+        temp_path = self.file_path + '.tmp'
+        try:
+            # CSV 带 BOM，Excel 直接打开不会乱码
+            encoding = 'utf-8-sig' if self.fmt == 'csv' else 'utf-8'
+            with open(temp_path, 'w', encoding=encoding, newline='', buffering=self.BUFFER_SIZE) as f:
+                if self.fmt == 'csv':
+                    writer = csv.writer(f)
+                    writer.writerow(headers)
+                elif self.fmt == 'md':
+                    f.write('| ' + ' | '.join(headers) + ' |\n')
+                    f.write('|' + ' --- |' * len(headers) + '\n')
+                for row in self.rows():
+                    if self.cancelled:
+                        self.interrupted = True
+                        break
+                    # row: 序号、8 个展示列、危害等级、完整路径
+                    if self.fmt == 'csv':
+                        writer.writerow(row[:9] + row[10:])
+                    elif self.fmt == 'jsonl':
+                        values = (row[0], row[1], row[9]) + row[3:9] + row[10:]
+                        f.write(json.dumps(dict(zip(self.JSON_KEYS, values)), ensure_ascii=False) + '\n')
+                    else:
+                        f.write('| ' + ' | '.join(self.markdownCell(value) for value in row[:9] + row[10:]) + ' |\n')
+                    count += 1
+                    if count % 1000 == 0 and self.total:
+                        self.progress.emit(min(99, count * 100 // self.total))
+            if not self.interrupted:
+                os.replace(temp_path, self.file_path)
+        except Exception as e:
+            error = str(e)
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        self.progress.emit(100)
+        self.exportFinished.emit(count, error)
+
+
+REGEX_CHUNK_SIZE = 200  # 每个任务包含的模板数
+REGEX_CHUNK_BUDGET = 2.0  # 每个任务的时间预算（秒）
+REGEX_POOL_GRACE = 5.0  # 等待结果时额外的宽限，超过即认为正则卡死（进程池预热完成后才开始计时）
+
+_regex_cache = {}
+_regex_active = None  # 工作进程中与主进程共享的当前搜索序号
+
+
+def initRegexWorker(active):
+    global _regex_active
+    _regex_active = active
+
+
+def regexSearchChunk(task):
+    """进程池工作函数：在一批模板原文中执行正则搜索，返回 (任务序号, 命中的 rid, 未处理的数量)
+
+    正则在每个工作进程中只编译一次。超出时间预算，或所属搜索已被取消、取代时提前返回。
+    """
+    search_id, chunk, pattern, flags, items, budget = task
+    regex = _regex_cache.get((pattern, flags))
+    if regex is None:
+        regex = _regex_cache[(pattern, flags)] = re.compile(pattern, flags)
+    deadline = time.monotonic() + budget
+    hits = []
+    for index, (rid, content, file_path) in enumerate(items):
+        if time.monotonic() > deadline or _regex_active.value != search_id:
+            return chunk, hits, len(items) - index
+        if content is None:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+        if regex.search(content):
+            hits.append(rid)
+    return chunk, hits, 0
+
+
+class RegexWorkerPool:
+    """正则搜索的常驻进程池：首次搜索时在搜索线程中创建并预热，之后的搜索复用，被终止后下次搜索再重建
+
+    active 是与工作进程共享的当前搜索序号，被取消或取代的搜索的任务看到序号变化后立即返回。
+    新搜索要等被取消的搜索回收完已提交的任务后才开始，避免排在卡死的任务后面而被误判为卡死。
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.active = None
+        self.running = set()  # 已提交任务且尚未回收完的搜索序号
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+
+    def acquire(self, search_id, cancelled):
+        """返回可用的进程池，并把 search_id 设为当前搜索；等待期间被取消时返回 None
+
+        在搜索线程中调用，进程启动和等待旧搜索都不阻塞界面。
+        """
+        with self.lock:
+            while self.running - {search_id} and not cancelled():
+                self.idle.wait(0.2)
+            if cancelled():
+                return None
+            self.running.add(search_id)
+            if self.pool is None:
+                # 使用 spawn，避免在带有 Qt 线程的进程中 fork
+                context = multiprocessing.get_context('spawn')
+                self.active = context.Value('i', 0, lock=False)
+                self.pool = context.Pool(processes=os.cpu_count() or 2, initializer=initRegexWorker,
+                                         initargs=(self.active,))
+                self.pool.apply(os.getpid)  # 等待工作进程启动，启动耗时不计入卡死判断
+            self.active.value = search_id
+            return self.pool
+
+    def release(self, search_id):
+        with self.lock:
+            self.running.discard(search_id)
+            self.idle.notify_all()
+
+    def isCurrent(self, pool):
+        return self.pool is pool
+
+    def cancel(self, search_id):
+        active = self.active
+        if active is not None and active.value == search_id:
+            active.value = 0
+
+    def terminate(self, pool):
+        """终止卡在回溯中的进程池；已被替换的旧池只清理自身"""
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+                self.active = None
+        pool.terminate()
+        pool.join()
+
+    def close(self):
+        with self.lock:
+            pool, self.pool, self.active = self.pool, None, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+class RegexSearchThread(QThread):
+    """把正则搜索分发到进程池，结果按任务完成顺序流式返回"""
+    hitsFound = pyqtSignal(int, list)  # (搜索序号, 命中的 rid)
+    searchFinished = pyqtSignal(int, int, bool)  # (搜索序号, 超时跳过的模板数, 是否因卡死而中止)
+
+    def __init__(self, search_id, pattern, flags, items, workers):
+        super().__init__()
+        self.search_id = search_id
+        self.pattern = pattern
+        self.flags = flags
+        self.items = items
+        self.workers = workers  # RegexWorkerPool
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.workers.cancel(self.search_id)
+
+    def run(self):
+        chunks = {chunk: self.items[start:start + REGEX_CHUNK_SIZE]
+                  for chunk, start in enumerate(range(0, len(self.items), REGEX_CHUNK_SIZE))}
+        pending = set(chunks)
+        skipped = 0
+        aborted = False
+        pool = results = None
+        try:
+            while pending and not self.cancelled and not aborted:
+                pool = self.workers.acquire(self.search_id, lambda: self.cancelled)
+                if pool is None:
+                    break
+                results = pool.imap_unordered(regexSearchChunk, [
+                    (self.search_id, chunk, self.pattern, self.flags, chunks[chunk], REGEX_CHUNK_BUDGET)
+                    for chunk in sorted(pending)])
+                waited = 0.0
+                while pending and not self.cancelled:
+                    try:
+                        # 短超时轮询，以便及时响应取消
+                        chunk, hits, chunk_skipped = results.next(timeout=0.2)
+                    except multiprocessing.TimeoutError:
+                        if not self.workers.isCurrent(pool):
+                            break  # 进程池已被终止，剩余任务提交到新的进程池
+                        waited += 0.2
+                        if waited > REGEX_CHUNK_BUDGET + REGEX_POOL_GRACE:
+                            # 单个文件上的灾难性回溯无法在进程内中断，只能终止整个进程池
+                            aborted = True
+                            skipped += sum(len(chunks[chunk]) for chunk in pending)
+                            self.workers.terminate(pool)
+                            break
+                        continue
+                    pending.discard(chunk)
+                    waited = 0.0
+                    skipped += chunk_skipped
+                    if hits:
+                        self.hitsFound.emit(self.search_id, hits)
+        except re.error:
+            aborted = True
+        finally:
+            if self.cancelled and pending and results is not None:
+                self.drain(pool, results, pending)
+            self.workers.release(self.search_id)
+        if not self.cancelled:
+            self.searchFinished.emit(self.search_id, skipped, aborted)
+
+    def drain(self, pool, results, pending):
+        """取消后回收已提交的任务
+
+        被取消的任务在处理下一个模板前就会返回，超过一个任务的时间预算仍未返回说明工作进程卡在回溯中，
+        此时终止进程池，后续搜索改用新的进程池。
+        """
+        deadline = time.monotonic() + REGEX_CHUNK_BUDGET
+        while pending and self.workers.isCurrent(pool) and time.monotonic() < deadline:
+            try:
+                chunk, _, _ = results.next(timeout=0.2)
+            except multiprocessing.TimeoutError:
+                continue
+            except re.error:
+                return
+            pending.discard(chunk)
+        if pending and self.workers.isCurrent(pool):
+            self.workers.terminate(pool)
+
+
+class SqlitePageCache:
+    """SQLite 模式下按块缓存 LIMIT/OFFSET 查询结果，滚动时只查询可见行所在的块"""
+
+    BLOCK = 200
+    CAPACITY = 16
+
+    def __init__(self, store, root, query):
+        self.store = store
+        self.root = root
+        self.query = query
+        self.blocks = OrderedDict()  # 块号 -> 记录列表
+
+    def record(self, row):
+        block = row // self.BLOCK
+        records = self.blocks.get(block)
+        if records is None:
+            records = self.store.page(self.root, self.query, block * self.BLOCK, self.BLOCK)
+            self.blocks[block] = records
+            while len(self.blocks) > self.CAPACITY:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(block)
+        offset = row - block * self.BLOCK
+        return records[offset] if offset < len(records) else {}
+
+
+class RowDisplayCache:
+    """表格展示值缓存：每条记录在加载或修改时计算一次不可变的展示元组 (PocTableModel.recordValues)
+
+    作为 PocIndex 的观察者维护，表格绘制时直接按 rid 取元组，不再逐格翻译危害、拼接标签和转换字符串。
+    """
+
+    def __init__(self):
+        self.values = {}  # rid -> 展示元组
+
+    def indexRebuilt(self, index):
+        record_values = PocTableModel.recordValues
+        self.values = {rid: record_values(record) for rid, record in index.items()}
+
+    def recordAdded(self, index, rid):
+        self.values[rid] = PocTableModel.recordValues(index.get(rid))
+
+    def recordRemoved(self, index, rid):
+        self.values.pop(rid, None)
+
+
+class PocTableModel(QAbstractTableModel):
+    """POC 结果表的虚拟模型
+
+    模型只保存行数和按行取记录的函数，视图绘制到哪一行才读取哪一行，因此十万级结果也无需分页。
+    内存模式下展示值直接取自 RowDisplayCache；SQLite 模式没有常驻记录，最近读取过的行的展示值保存在一个小的 LRU 中。
+    """
+
+    HEADERS = ['序号', '文件名', '危害', '作者', '标签', 'CVE编号', 'CVSS', '参考链接', '漏洞描述']
+    SEVERITY_LABELS = {'critical': '严重', 'high': '高危', 'medium': '中危', 'low': '低危', 'info': '信息'}
+    SEVERITY_COLORS = {
+        'critical': QColor("#FF0000"),  # 红色
+        'high': QColor("#FFA500"),  # 橙色
+        'medium': QColor("#FFD700"),  # 金色
+        'low': QColor("#008000"),  # 绿色
+        'info': QColor("#0000FF"),  # 蓝色
+    }
+    # 危害列的前景画刷，所有单元格共用同一实例
+    SEVERITY_BRUSHES = {severity: QBrush(color) for severity, color in SEVERITY_COLORS.items()}
+    DEFAULT_BRUSH = QBrush(QColor("#000000"))
+    ROW_CACHE_SIZE = 512
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.count = 0
+        self.fetch = None  # 行号 -> 记录
+        self.display = None  # 行号 -> 缓存的展示元组，None 时按需计算
+        self.row_cache = OrderedDict()  # 行号 -> 展示值
+
+    def setRows(self, count, fetch, display=None):
+        self.beginResetModel()
+        self.count = count
+        self.fetch = fetch
+        self.display = display
+        self.row_cache.clear()
+        self.endResetModel()
+
+    def appendRows(self, count):
+        """数据源末尾追加了 count 条记录（流式搜索结果）"""
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.count, self.count + count - 1)
+        self.count += count
+        self.endInsertRows()
+
+    def record(self, row):
+        if 0 <= row < self.count:
+            return self.fetch(row)
+        return {}
+
+    @classmethod
+    def recordValues(cls, item):
+        """除序号外各列的展示文本，末尾附加小写的危害等级（导出也使用这些值）"""
+        info = item.get('info', {}) or {}
+        severity_key = str(info.get('severity', '') or '').lower()
+        tags = info.get('tags', [])
+        if isinstance(tags, list):
+            tags = ', '.join(str(tag) for tag in tags)
+        reference = info.get('reference', [])
+        if isinstance(reference, list):
+            reference = reference[0] if reference else ''
+        classification = info.get('classification', {}) or {}
+        return (
+            str(item.get('original_filename', '') or ''),  # 相对路径
+            cls.SEVERITY_LABELS.get(severity_key, str(info.get('severity', '') or '')),
+            str(info.get('author', '') or ''),
+            str(tags or ''),
+            str(classification.get('cve-id', '') or ''),
+            str(classification.get('cvss-score', '') or ''),
+            str(reference or ''),
+            str(info.get('description', '') or ''),
+            severity_key,
+        )
+
+    def rowValues(self, row):
+        """第 row 行的展示元组（不含序号列）"""
+        if self.display is not None:
+            return self.display(row)
+        values = self.row_cache.get(row)
+        if values is not None:
+            return values
+        values = self.recordValues(self.fetch(row))
+        self.row_cache[row] = values
+        if len(self.row_cache) > self.ROW_CACHE_SIZE:
+            self.row_cache.popitem(last=False)
+        return values
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            row = index.row()
+            if column == 0:
+                return str(row + 1)
+            display = self.display
+            return (display(row) if display is not None else self.rowValues(row))[column - 1]
+        if role == Qt.ForegroundRole and column == 2:
+            row = index.row()
+            display = self.display
+            values = display(row) if display is not None else self.rowValues(row)
+            return self.SEVERITY_BRUSHES.get(values[8], self.DEFAULT_BRUSH)
+        return None
+
+
+class SelectedRowDelegate(QStyledItemDelegate):
+    """选中行由委托绘制浅蓝背景并保留原文字颜色（危害列的颜色在选中时仍可见）
+
+    选中状态由视图的选择模型维护，切换选中行时视图只重绘前后两行。
+    """
+
+    SELECTED_BRUSH = QBrush(QColor(220, 220, 255))
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, self.SELECTED_BRUSH)
+            option = QStyleOptionViewItem(option)
+            option.state &= ~QStyle.State_Selected
+        super().paint(painter, option, index)
+
+
+class DirectoryNode:
+    """目录树中的目录节点；children 为已交给视图的子项，pending 为尚未取出的子项"""
+    __slots__ = ('name', 'parent', 'dirs', 'files', 'count', 'children', 'pending', 'row')
+
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.dirs = {}  # 名称 -> DirectoryNode
+        self.files = {}  # 名称 -> FileLeaf
+        self.count = 0  # 子树中的模板数
+        self.children = None  # None 表示子项列表尚未生成
+        self.pending = []
+        self.row = 0
+
+    def sortKey(self):
+        return (0, self.name.lower(), self.name)
+
 
-    def toggleMaximize(self):
-        if not self.is_maximized:
-            parent = self.parent()
-            while parent and not isinstance(parent, QMainWindow):
-                parent = parent.parent()
+class FileLeaf:
+    __slots__ = ('name', 'parent', 'rid', 'row')
 
-            if parent:
-                self.main_window = parent
-                self.original_geometry = self.geometry()
-                self.original_parent = self.parent()
+    def __init__(self, name, parent, rid):
+        self.name = name
+        self.parent = parent
+        self.rid = rid
+        self.row = 0
 
-                central_widget = self.main_window.centralWidget()
-                main_rect = central_widget.rect()
-                global_pos = central_widget.mapToGlobal(main_rect.topLeft())
+    def sortKey(self):
+        return (1, self.name.lower(), self.name)
 
-                self.setParent(None)
-                self.setGeometry(QRect(global_pos, main_rect.size()))
-                self.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint)
-                self.show()
-                self.maximize_btn.setText("❐")
-                self.raise_()
-                self.activateWindow()
-        else:
-            if self.original_parent and self.original_geometry:
-                self.setParent(self.original_parent)
-                self.setGeometry(self.original_geometry)
-                self.setWindowFlags(Qt.Widget)
-                self.show()
-                self.maximize_btn.setText("□")
 
-        self.is_maximized = not self.is_maximized
+class DirectoryTreeModel(QAbstractItemModel):
+    """按 original_filename 的目录层级浏览模板
 
-    def keyPressEvent(self, event):
-        if event.key() == Qt.Key_Escape and self.is_maximized:
-            self.toggleMaximize()
-        super().keyPressEvent(event)
+    目录节点来自索引而不是磁盘，子树模板数在加载时一次性累加；
+    子项通过 canFetchMore/fetchMore 分批交给视图，展开包含数千个模板的目录也不会卡顿。
+    作为 PocIndex 的观察者，保存与删除只插入或移除受影响的行，已展开的目录保持不变。
+    """
 
-    def mousePressEvent(self, event):
-        if self.is_maximized:
-            self.drag_pos = event.globalPos()
-        super().mousePressEvent(event)
+    HEADERS = ['目录 / 模板', '数量']
+    FETCH_BATCH = 500
 
-    def mouseMoveEvent(self, event):
-        if self.is_maximized and hasattr(self, 'drag_pos'):
-            delta = event.globalPos() - self.drag_pos
-            self.move(self.pos() + delta)
-            self.drag_pos = event.globalPos()
-        super().mouseMoveEvent(event)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = DirectoryNode('', None)
+        self.leaves = {}  # rid -> FileLeaf
+
+    # ---- 索引观察者 ----
+
+    def indexRebuilt(self, index):
+        self.beginResetModel()
+        self.root = DirectoryNode('', None)
+        self.leaves = {}
+        for rid, record in index.items():
+            node = self.root
+            node.count += 1
+            parts = self.pathParts(record)
+            for part in parts[:-1]:
+                child = node.dirs.get(part)
+                if child is None:
+                    child = node.dirs[part] = DirectoryNode(part, node)
+                node = child
+                node.count += 1
+            leaf = node.files[parts[-1]] = FileLeaf(parts[-1], node, rid)
+            self.leaves[rid] = leaf
+        self.endResetModel()
+
+    def recordAdded(self, index, rid):
+        node = self.root
+        node.count += 1
+        parts = self.pathParts(index.get(rid))
+        for part in parts[:-1]:
+            child = node.dirs.get(part)
+            if child is None:
+                child = node.dirs[part] = DirectoryNode(part, node)
+                self.insertChild(node, child)
+            node = child
+            node.count += 1
+            self.emitCountChanged(node)
+        leaf = node.files[parts[-1]] = FileLeaf(parts[-1], node, rid)
+        self.leaves[rid] = leaf
+        self.insertChild(node, leaf)
+
+    def recordRemoved(self, index, rid):
+        leaf = self.leaves.pop(rid, None)
+        if leaf is None:
+            return
+        node = leaf.parent
+        self.removeChild(node, leaf)
+        del node.files[leaf.name]
+        while node is not None:
+            node.count -= 1
+            parent = node.parent
+            if node.count == 0 and parent is not None:
+                self.removeChild(parent, node)
+                del parent.dirs[node.name]
+            elif parent is not None:
+                self.emitCountChanged(node)
+            node = parent
+
+    @staticmethod
+    def pathParts(record):
+        path = str(record.get('original_filename', '') or record.get('file_path', ''))
+        return [part for part in path.replace('\\', '/').split('/') if part] or ['?']
+
+    # ---- 增量更新 ----
+
+    def nodeIndex(self, node):
+        if node is self.root or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def isVisible(self, item):
+        parent = item.parent
+        return parent.children is not None and item.row < len(parent.children) and parent.children[item.row] is item
+
+    def insertChild(self, node, item):
+        if node.children is None:
+            return  # 子项列表尚未生成，之后生成时自然包含
+        key = item.sortKey()
+        keys = [child.sortKey() for child in node.children]
+        position = bisect.bisect_left(keys, key)
+        if position == len(node.children) and node.pending:
+            pending_keys = [child.sortKey() for child in node.pending]
+            node.pending.insert(bisect.bisect_left(pending_keys, key), item)
+            return
+        self.beginInsertRows(self.nodeIndex(node), position, position)
+        node.children.insert(position, item)
+        for row in range(position, len(node.children)):
+            node.children[row].row = row
+        self.endInsertRows()
+
+    def removeChild(self, node, item):
+        if node.children is None:
+            return
+        if self.isVisible(item):
+            position = item.row
+            self.beginRemoveRows(self.nodeIndex(node), position, position)
+            del node.children[position]
+            for row in range(position, len(node.children)):
+                node.children[row].row = row
+            self.endRemoveRows()
+        elif item in node.pending:
+            node.pending.remove(item)
+
+    def emitCountChanged(self, node):
+        if node.parent is not None and self.isVisible(node):
+            index = self.createIndex(node.row, 1, node)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    # ---- 懒加载 ----
+
+    def ensureChildList(self, node):
+        if node.children is None:
+            node.children = []
+            node.pending = sorted(node.dirs.values(), key=DirectoryNode.sortKey)
+            node.pending.extend(sorted(node.files.values(), key=FileLeaf.sortKey))
+
+    def nodeAt(self, parent):
+        """返回 parent 对应的目录节点；文件或非第 0 列的索引没有子项，返回 None"""
+        if not parent.isValid():
+            return self.root
+        item = parent.internalPointer()
+        if parent.column() != 0 or not isinstance(item, DirectoryNode):
+            return None
+        return item
 
+    def canFetchMore(self, parent):
+        node = self.nodeAt(parent)
+        if node is None:
+            return False
+        return node.children is None or bool(node.pending)
 
-# 新增一个线程类用于加载POC
-class LoadPOCThread(QThread):
-    finished = pyqtSignal(list)  # 定义信号，用于传递加载的POC数据
-    progress = pyqtSignal(int)  # 定义信号，用于更新进度
+    def fetchMore(self, parent):
+        node = self.nodeAt(parent)
+        if node is None:
+            return
+        self.ensureChildList(node)
+        batch = node.pending[:self.FETCH_BATCH]
+        if not batch:
+            return
+        # 先从 pending 取出，视图在 beginInsertRows 期间重入 fetchMore 时不会重复插入同一批
+        del node.pending[:len(batch)]
+        start = len(node.children)
+        self.beginInsertRows(self.nodeIndex(node), start, start + len(batch) - 1)
+        for offset, item in enumerate(batch):
+            item.row = start + offset
+        node.children.extend(batch)
+        self.endInsertRows()
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.nodeAt(parent)
+        return node is not None and bool(node.dirs or node.files)
+
+    # ---- QAbstractItemModel ----
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.nodeAt(parent)
+        if node is None or node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.nodeIndex(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        node = self.nodeAt(parent)
+        if node is None or node.children is None:
+            return 0
+        return len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
 
-    def __init__(self, folder_path):
-        super().__init__()
-        self.folder_path = folder_path
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return item.name
+            return str(item.count) if isinstance(item, DirectoryNode) else None
+        if role == Qt.TextAlignmentRole and index.column() == 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
 
-    def run(self):
-        yaml_data = []
-        total_files = 0
+    def subtreeRids(self, index):
+        """选中节点子树中的全部 rid（按原始顺序）"""
+        if not index.isValid():
+            return []
+        item = index.internalPointer()
+        if isinstance(item, FileLeaf):
+            return [item.rid]
+        rids = []
+        stack = [item]
+        while stack:
+            node = stack.pop()
+            rids.extend(leaf.rid for leaf in node.files.values())
+            stack.extend(node.dirs.values())
+        rids.sort()
+        return rids
+
+
+class FilterHeader(QHeaderView):
+    """带筛选行的水平表头：在指定列的表头下方放置输入框，内容变化时发出 filterChanged(列, 文本)"""
+    filterChanged = pyqtSignal(int, str)
+
+    def __init__(self, placeholders, parent=None):
+        super().__init__(Qt.Horizontal, parent)
+        self.setSectionsClickable(True)
+        self.editors = {}
+        for column, placeholder in placeholders.items():
+            editor = QLineEdit(self)
+            editor.setPlaceholderText(placeholder)
+            editor.setToolTip(placeholder)
+            editor.setClearButtonEnabled(True)
+            editor.setStyleSheet("QLineEdit { padding: 1px 3px; border: 1px solid #CCCCCC; }")
+            editor.textChanged.connect(lambda text, column=column: self.filterChanged.emit(column, text))
+            self.editors[column] = editor
+        self.editor_height = max((editor.sizeHint().height() for editor in self.editors.values()), default=0)
+        self.sectionResized.connect(self.adjustEditors)
+        self.sectionMoved.connect(self.adjustEditors)
 
-        # 计算文件总数
-        for root, _, files in os.walk(self.folder_path):
-            total_files += sum(1 for file in files if file.lower().endswith('.yaml'))
+    def sizeHint(self):
+        size = super().sizeHint()
+        size.setHeight(size.height() + self.editor_height + 4)
+        return size
 
-        processed_files = 0  # 处理的文件计数
+    def updateGeometries(self):
+        # 表头文字只画在上半部分，下方留给筛选输入框
+        self.setViewportMargins(0, 0, 0, self.editor_height + 4)
+        super().updateGeometries()
+        self.adjustEditors()
 
-        try:
-            for root, _, files in os.walk(self.folder_path):
-                for file in files:
-                    if file.lower().endswith('.yaml'):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                data = yaml.safe_load(content)
-                                if isinstance(data, dict):
-                                    # 获取相对路径
-                                    relative_path = os.path.relpath(file_path, self.folder_path)
-                                    data['original_filename'] = relative_path  # 使用相对路径加文件名
-                                    data['file_path'] = file_path
-                                    yaml_data.append(data)
-                        except Exception as e:
-                            print(f"加载文件出错 {file}: {str(e)}")
-
-                        processed_files += 1
-                        self.progress.emit(int((processed_files / total_files) * 100))  # 更新进度
+    def adjustEditors(self, *args):
+        top = super().sizeHint().height() + 2
+        for column, editor in self.editors.items():
+            editor.setGeometry(self.sectionViewportPosition(column) + 1, top,
+                               self.sectionSize(column) - 2, self.editor_height)
+            editor.setVisible(not self.isSectionHidden(column))
 
-        except Exception as e:
-            print(f"加载目录失败: {str(e)}")
+    def filterText(self, column):
+        return self.editors[column].text()
 
-        self.finished.emit(yaml_data)  # 发射信号，传递加载的数据
+    def clearFilters(self):
+        for editor in self.editors.values():
+            editor.blockSignals(True)
+            editor.clear()
+            editor.blockSignals(False)
 
 
 class NucleiPOCManager(QMainWindow):
+    # 可排序的表格列 -> SortKeyIndex 字段
+    SORT_COLUMNS = {0: 'raw', 1: 'path', 2: 'severity', 3: 'author', 5: 'cve', 6: 'cvss'}
+    # 表头筛选行：列 -> (PocIndex 字段, 提示文字)
+    FILTER_COLUMNS = {
+        2: ('severity', "如 critical,high"),
+        3: ('author', "作者包含"),
+        4: ('tag', "标签包含"),
+        5: ('cve', "如 2023"),
+    }
+    SEVERITY_VALUES = {label: value for value, label in PocTableModel.SEVERITY_LABELS.items()}
+
     def __init__(self):
         super().__init__()
         self.temp_dirs = []  # 用于存储临时目录路径
@@ -724,11 +3975,59 @@ class NucleiPOCManager(QMainWindow):
         self.filtered_yaml_data = []
         self.yaml_folder_path = None
         self.temp_dirs = []
-        self.current_page = 1
-        self.rows_per_page = 50
         self.search_keyword = ''
+        self.poc_index = PocIndex()  # 记录索引
+        self.query_cache = QueryResultCache()  # 查询结果缓存
+        self.collections = SmartCollections(
+            os.path.join(os.path.expanduser('~'), '.nuclei_manager_collections'))  # 保存的搜索
+        self.collections.load()
+        self.poc_index.observers.append(self.collections)
+        self.quick_index = QuickOpenIndex()  # Ctrl+P 快速打开
+        self.poc_index.observers.append(self.quick_index)
+        self.term_dictionary = TermDictionary()  # 搜索补全词典
+        self.poc_index.observers.append(self.term_dictionary)
+        self.sort_index = SortKeyIndex()  # 表格排序键
+        self.poc_index.observers.append(self.sort_index)
+        self.display_cache = RowDisplayCache()  # 表格展示值
+        self.poc_index.observers.append(self.display_cache)
+        self.directory_model = DirectoryTreeModel(self)  # 目录树
+        self.poc_index.observers.append(self.directory_model)
+        self.corpus_stats = CorpusStats()  # 模板库统计
+        self.poc_index.observers.append(self.corpus_stats)
+        self.collections_generation = -1
+        self.settings = self.loadSettings()
+        self.sqlite_store = self.openSqliteStore() if self.settings.get('sqlite_index') else None
+        # 最近使用目录的常驻索引，切换目录时不必重新加载；个数与内存上限（MB）可在设置文件中调整
+        self.folder_cache = FolderIndexCache(int(self.settings.get('resident_folders', 2)),
+                                             int(self.settings.get('resident_memory_mb', 1024)) << 20)
+        self.prefetch_thread = None  # 后台预取常用目录的线程
+        self.sqlite_query = ('OR', ())  # SQLite 模式下的当前查询
+        self.sqlite_result_count = 0
+        self.result_bits = 0  # 当前结果集位图，用于分面统计
+        self.current_query = None  # 最近一次搜索的 SearchQuery
+        self.ordering = 'raw'  # 结果排序方式：raw 原始顺序 / relevance 相关度 / cvss
+        self.ranked_results = None
+        self.sort_field = None  # 表头点击选择的排序字段，优先于 ordering
+        self.sort_descending = False
+        self.display_rids = None  # 需要按显式顺序显示时的 rid 列表（表头排序或表头筛选）
+        self.column_filters = {}  # 列 -> 筛选文本
+        self.column_filter_bits = None  # 表头筛选的交集位图，没有筛选时为 None
+        self.column_filter_generation = -1
+        self.result_active = False  # filtered_yaml_data 是否为显式的结果集（可能为空）
+        self.regex_thread = None
+        self.regex_workers = RegexWorkerPool()  # 正则搜索的进程池，整个窗口生命周期内复用
+        self.export_thread = None
+        self.validate_thread = None  # 会话快照的后台校验线程
+        self.retired_threads = []
+        self.regex_search_id = 0
+        self.regex_started = 0.0
+        self.file_states = {}  # 文件路径 -> 加载时的 (mtime, size)
         self.folder_history = self.loadFolderHistory()
+        self.session = self.loadSession()  # 上次关闭时保存的会话
+        self.pending_session = None  # 数据就绪后需要恢复的会话（查询、排序、选中行、编辑内容）
+        self.editor_path = None  # 编辑器中内容对应的文件，新建模板时为 None
         self.initUI()
+        self.restoreLayout(self.session)
         self.load_thread = None  # 初始化线程变量
         self.loadLastFolder()
 
@@ -756,7 +4055,7 @@ class NucleiPOCManager(QMainWindow):
                 border-radius: 3px;
                 background-color: white;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 gridline-color: #E5E5E5;
             }
@@ -778,31 +4077,73 @@ class NucleiPOCManager(QMainWindow):
         # Top search bar
         top_layout = QHBoxLayout()
         self.search_line_edit = QLineEdit()
-        self.search_line_edit.setPlaceholderText("全局搜索 (支持 AND/OR 操作)")
+        self.search_line_edit.setPlaceholderText("全局搜索 (支持 AND/OR 操作，数值过滤如 year>=2023 cvss>=9 epss>0.5)")
         self.search_line_edit.setClearButtonEnabled(True)
         self.search_line_edit.textChanged.connect(self.onSearchTextChanged)
 
+        # 补全只替换光标前的最后一个词，因此不用 setCompleter，由 updateCompletions 手动填充与弹出
+        self.completion_model = QStringListModel(self)
+        self.search_completer = QCompleter(self.completion_model, self)
+        self.search_completer.setWidget(self.search_line_edit)
+        self.search_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.search_completer.activated[str].connect(self.insertCompletion)
+        self.search_line_edit.textEdited.connect(self.updateCompletions)
+
         self.search_button = QPushButton("搜索")
         self.search_button.clicked.connect(lambda: self.searchTable(self.search_line_edit.text()))
 
         reset_button = QPushButton("重置")
         reset_button.clicked.connect(self.resetSearch)
 
+        self.ordering_combo = QComboBox()
+        self.ordering_combo.addItem("原始顺序", 'raw')
+        self.ordering_combo.addItem("相关度", 'relevance')
+        self.ordering_combo.addItem("CVSS 从高到低", 'cvss')
+        self.ordering_combo.setToolTip("搜索结果排序方式")
+        self.ordering_combo.currentIndexChanged.connect(self.onOrderingChanged)
+
+        self.collection_combo = QComboBox()
+        self.collection_combo.setToolTip("打开保存的搜索（智能集合），成员随模板增删改自动更新")
+        self.collection_combo.setMinimumWidth(140)
+        self.collection_combo.activated.connect(self.openCollection)
+        self.refreshCollectionCombo()
+
+        save_search_button = QPushButton("保存搜索")
+        save_search_button.clicked.connect(self.saveCurrentSearch)
+
+        delete_collection_button = QPushButton("删除集合")
+        delete_collection_button.clicked.connect(self.deleteCollection)
+
+        export_button = QPushButton("导出结果")
+        export_button.setToolTip("把表格中的结果导出为 CSV、JSONL 或 Markdown")
+        export_button.clicked.connect(self.exportResults)
+
         folder_button = QPushButton("打开目录")
         folder_button.clicked.connect(self.selectFolder)
 
         self.total_files_label = QLabel("POC总数: 0")
 
+        self.sqlite_checkbox = QCheckBox("SQLite索引")
+        self.sqlite_checkbox.setToolTip("使用持久化 SQLite 索引（适合超大模板库，启动时只增量同步修改过的文件）")
+        self.sqlite_checkbox.setChecked(self.sqlite_store is not None)
+        self.sqlite_checkbox.toggled.connect(self.toggleSqliteIndex)
+
         top_layout.addWidget(self.search_line_edit)
         top_layout.addWidget(self.search_button)
+        top_layout.addWidget(self.ordering_combo)
         top_layout.addWidget(reset_button)
+        top_layout.addWidget(self.collection_combo)
+        top_layout.addWidget(save_search_button)
+        top_layout.addWidget(delete_collection_button)
+        top_layout.addWidget(export_button)
         top_layout.addWidget(folder_button)
+        top_layout.addWidget(self.sqlite_checkbox)
         top_layout.addWidget(self.total_files_label)
 
         # Create main vertical splitter
         main_splitter = QSplitter(Qt.Vertical)
 
-        # Top container for table and pagination
+        # Top container for search bar and table
         top_container = QWidget()
         top_layout_container = QVBoxLayout(top_container)
         top_layout_container.setContentsMargins(0, 0, 0, 0)
@@ -810,42 +4151,30 @@ class NucleiPOCManager(QMainWindow):
         # Add search bar
         top_layout_container.addLayout(top_layout)
 
-        # Add table
-        self.tableWidget = QTableWidget()
+        # Add table and facet panel
+        table_splitter = QSplitter(Qt.Horizontal)
+
+        # 目录树：按相对路径层级浏览，选中目录即把其子树设为当前结果集（也是批量运行的范围）
+        self.directory_tree = QTreeView()
+        self.directory_tree.setModel(self.directory_model)
+        self.directory_tree.setUniformRowHeights(True)
+        self.directory_tree.header().setStretchLastSection(False)
+        self.directory_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.directory_tree.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.directory_tree.selectionModel().currentChanged.connect(self.onDirectorySelected)
+        table_splitter.addWidget(self.directory_tree)
+
+        self.tableView = QTableView()
+        self.table_model = PocTableModel(self)
         self.setupTable()
-        top_layout_container.addWidget(self.tableWidget)
-
-        # Add pagination
-        pagination_layout = QHBoxLayout()
-        pagination_layout.addStretch()  # 添加弹性空间将按钮移到右侧
-
-        # 缩小按钮宽度
-        self.prev_page_btn = QPushButton("上一页")
-        self.prev_page_btn.setFixedWidth(60)  # 设置按钮宽度
-
-        self.next_page_btn = QPushButton("下一页")
-        self.next_page_btn.setFixedWidth(60)  # 设置按钮宽度
+        table_splitter.addWidget(self.tableView)
 
-        self.page_label = QLabel()
-
-        self.page_input = QLineEdit()
-        self.page_input.setFixedWidth(50)  # 设置输入框宽度
-        self.page_input.setPlaceholderText("页码")
-
-        self.goto_page_btn = QPushButton("跳转")
-        self.goto_page_btn.setFixedWidth(60)  # 设置按钮宽度
-
-        self.prev_page_btn.clicked.connect(self.prevPage)
-        self.next_page_btn.clicked.connect(self.nextPage)
-        self.goto_page_btn.clicked.connect(self.gotoPage)
-
-        pagination_layout.addWidget(self.prev_page_btn)
-        pagination_layout.addWidget(self.page_label)
-        pagination_layout.addWidget(self.page_input)
-        pagination_layout.addWidget(self.goto_page_btn)
-        pagination_layout.addWidget(self.next_page_btn)
-
-        top_layout_container.addLayout(pagination_layout)
+        self.facet_panel = FacetPanel()
+        self.facet_panel.facetClicked.connect(self.refineWithFacet)
+        table_splitter.addWidget(self.facet_panel)
+        table_splitter.setSizes([int(self.width() * 0.16), int(self.width() * 0.68), int(self.width() * 0.16)])
+        self.table_splitter = table_splitter
+        top_layout_container.addWidget(table_splitter)
 
         # Add top container to main splitter
         main_splitter.addWidget(top_container)
@@ -868,16 +4197,22 @@ class NucleiPOCManager(QMainWindow):
 
         # Editor widget
         self.editor_widget = EditorWidget()
+        self.editor_widget.similarRequested.connect(self.findSimilarToText)
+        self.editor_widget.loadFinished.connect(
+            lambda: self.statusBar().showMessage("大文件加载完成（大文件模式：超长行只高亮开头部分）", 5000))
+        self.editor_widget.issuesChanged.connect(self.onEditorIssuesChanged)
         bottom_splitter.addWidget(self.editor_widget)
 
         # Set the initial sizes for horizontal splitter (30% - 70%)
         bottom_splitter.setSizes([int(self.width() * 0.3), int(self.width() * 0.7)])
+        self.bottom_splitter = bottom_splitter
 
         # Add bottom splitter to main splitter
         main_splitter.addWidget(bottom_splitter)
 
         # Set the initial sizes for vertical splitter (60% - 40%)
         main_splitter.setSizes([int(self.height() * 0.6), int(self.height() * 0.4)])
+        self.main_splitter = main_splitter
 
         # Add main splitter to layout
         main_layout.addWidget(main_splitter)
@@ -930,46 +4265,108 @@ class NucleiPOCManager(QMainWindow):
 
         main_layout.addLayout(bottom_layout)
 
-    def setupTable(self):
-        self.tableWidget.setColumnCount(8)
-        headers = ['序号', '文件名', '危害', '作者', '标签', 'CVE编号', '参考链接', '漏洞描述']
-        self.tableWidget.setHorizontalHeaderLabels(headers)
+        # 调试面板（默认隐藏，F12 切换）
+        self.debug_panel = DebugPanel(self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.debug_panel)
+        self.debug_panel.hide()
+        QShortcut(QKeySequence("F12"), self, self.toggleDebugPanel)
+
+        # 模板统计面板（默认隐藏，F10 切换）
+        self.stats_panel = StatsPanel(self)
+        self.stats_panel.exportRequested.connect(self.exportCorpusStats)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.stats_panel)
+        self.stats_panel.hide()
+        QShortcut(QKeySequence("F10"), self, self.toggleStatsPanel)
+        QShortcut(QKeySequence("Ctrl+P"), self, self.showQuickOpen)
+
+    def toggleDebugPanel(self):
+        self.debug_panel.setVisible(not self.debug_panel.isVisible())
+        self.refreshDebugPanel()
+
+    def refreshDebugPanel(self):
+        if self.debug_panel.isVisible():
+            self.debug_panel.refresh(self.query_cache, self.poc_index.generation)
+
+    def toggleStatsPanel(self):
+        self.stats_panel.setVisible(not self.stats_panel.isVisible())
+        self.refreshStatsPanel()
+
+    def refreshStatsPanel(self):
+        if self.stats_panel.isVisible():
+            self.stats_panel.refresh(self.corpus_stats)
+
+    def updateStatsBaseline(self):
+        """以该目录上次加载时的摘要作为增长基准，并记录本次加载的摘要"""
+        if not self.yaml_folder_path:
+            return
+        history = self.settings.setdefault('corpus_stats', {})
+        self.corpus_stats.setBaseline(history.get(self.yaml_folder_path))
+        history[self.yaml_folder_path] = self.corpus_stats.summary()
+        self.saveSettings()
+
+    def exportCorpusStats(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出统计", "nuclei_stats.json", "JSON 文件 (*.json)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(self.corpus_stats.exportData(self.yaml_folder_path), f, ensure_ascii=False, indent=2)
+            self.statusBar().showMessage(f"统计已导出到 {file_path}", 5000)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"导出统计失败: {str(e)}")
 
-        # 禁用排序功能
-        self.tableWidget.setSortingEnabled(False)
+    def setupTable(self):
+        self.filter_header = FilterHeader({column: placeholder
+                                           for column, (_, placeholder) in self.FILTER_COLUMNS.items()},
+                                          self.tableView)
+        self.filter_header.filterChanged.connect(self.onColumnFilterChanged)
+        self.tableView.setHorizontalHeader(self.filter_header)
+        self.tableView.horizontalScrollBar().valueChanged.connect(self.filter_header.adjustEditors)
+        self.tableView.setModel(self.table_model)
+
+        # 不使用视图自带的排序，点击表头时按预计算的排序键重排结果集
+        self.tableView.setSortingEnabled(False)
+        self.tableView.horizontalHeader().setSortIndicatorShown(True)
+        self.tableView.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.tableView.horizontalHeader().sectionClicked.connect(self.onHeaderClicked)
 
         # 设置交替行颜色
-        self.tableWidget.setAlternatingRowColors(True)
-        self.tableWidget.setStyleSheet("""
-            QTableWidget {
+        self.tableView.setAlternatingRowColors(True)
+        self.tableView.setStyleSheet("""
+            QTableView {
                 background-color: #FFFFFF;  /* 白色背景 */
                 gridline-color: #E5E5E5;  /* 网格线颜色 */
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTableWidget::item:selected {
-                background-color: #4A90E2;  /* 选中行的背景色 */
-                color: white;  /* 选中行的文字颜色 */
-            }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #D0E1F9;  /* 鼠标悬停行的背景色 */
             }
         """)
 
-        self.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
-        self.tableWidget.verticalHeader().setVisible(False)
-        self.tableWidget.setShowGrid(True)
-
-        widths = [40, 255, 60, 100, 160, 106, 310, 0]
+        self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.tableView.verticalHeader().setVisible(False)
+        # 固定行高，视图无需逐行测量即可计算滚动范围
+        self.tableView.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tableView.verticalHeader().setDefaultSectionSize(28)
+        self.tableView.setWordWrap(False)
+        self.tableView.setShowGrid(True)
+        self.tableView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # 整行单选，选中行的背景由委托绘制
+        self.tableView.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tableView.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tableView.setItemDelegate(SelectedRowDelegate(self.tableView))
+
+        widths = [40, 255, 60, 100, 160, 106, 50, 310, 0]
         for col, width in enumerate(widths):
             if width > 0:
-                self.tableWidget.setColumnWidth(col, width)
+                self.tableView.setColumnWidth(col, width)
 
-        self.tableWidget.horizontalHeader().setStretchLastSection(True)
-        self.tableWidget.cellClicked.connect(self.onTableCellClicked)
-        self.tableWidget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.tableWidget.customContextMenuRequested.connect(self.showContextMenu)
+        self.tableView.horizontalHeader().setStretchLastSection(True)
+        self.tableView.clicked.connect(lambda index: self.onTableCellClicked(index.row()))
+        self.tableView.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tableView.customContextMenuRequested.connect(self.showContextMenu)
 
     def validateRunPrerequisites(self):
         targets = self.target_input.toPlainText().strip()
@@ -991,6 +4388,50 @@ class NucleiPOCManager(QMainWindow):
         except:
             return []
 
+    def loadSettings(self):
+        settings_file = os.path.join(os.path.expanduser('~'), '.nuclei_manager_settings.json')
+        try:
+            with open(settings_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def saveSettings(self):
+        settings_file = os.path.join(os.path.expanduser('~'), '.nuclei_manager_settings.json')
+        try:
+            with open(settings_file, 'w', encoding='utf-8') as f:
+                json.dump(self.settings, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存设置失败: {e}")
+
+    def openSqliteStore(self):
+        db_path = os.path.join(os.path.expanduser('~'), '.nuclei_manager_index.db')
+        try:
+            return SqlitePocStore(db_path)
+        except sqlite3.Error as e:
+            print(f"打开 SQLite 索引失败: {e}")
+            return None
+
+    def toggleSqliteIndex(self, checked):
+        """切换 SQLite 索引模式，并重新加载当前目录"""
+        if checked and not self.sqlite_store:
+            self.sqlite_store = self.openSqliteStore()
+            if not self.sqlite_store:
+                QMessageBox.warning(self, "错误", "当前 Python 的 SQLite 不支持 FTS5，无法启用 SQLite 索引")
+                self.sqlite_checkbox.setChecked(False)
+                return
+        elif not checked and self.sqlite_store:
+            self.sqlite_store.close()
+            self.sqlite_store = None
+
+        self.settings['sqlite_index'] = checked
+        self.saveSettings()
+        self.cancelPrefetch()
+        self.folder_cache.clear()  # SQLite 模式不在内存中保留索引
+        self.clearColumnFilters()
+        if self.yaml_folder_path:
+            self.loadFolder(self.yaml_folder_path)
+
     def saveFolderHistoryList(self, history_list):
         """
         保存历史��录列表
@@ -1091,7 +4532,256 @@ class NucleiPOCManager(QMainWindow):
         if self.folder_history:
             last_folder = self.folder_history[0]
             if os.path.exists(last_folder):
-                self.loadFolder(last_folder)
+                if self.session.get('folder') == last_folder:
+                    self.pending_session = self.session
+                if not self.restoreSnapshot(last_folder):
+                    self.loadFolder(last_folder)
+
+    # ---- 会话保存与恢复 ----
+
+    SESSION_VERSION = 2
+
+    def loadSession(self):
+        session_file = os.path.join(os.path.expanduser('~'), '.nuclei_manager_session.json')
+        try:
+            with open(session_file, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except:
+            return {}
+        return session if isinstance(session, dict) and session.get('version') == self.SESSION_VERSION else {}
+
+    def saveSession(self):
+        """关闭时保存会话：界面状态与索引快照（已解析的记录）都写入 JSON，下次启动时直接恢复"""
+        session = {
+            'version': self.SESSION_VERSION,
+            'folder': self.yaml_folder_path,
+            'view': self.captureViewState(),
+            'splitters': {name: splitter.sizes() for name, splitter in self.sessionSplitters()},
+        }
+        # 编辑器内容与磁盘上的文件不同时保存未保存的内容（大文件仍在加载时内容与磁盘相同）
+        content = self.editor_widget.editor.toPlainText()
+        if content.strip() and not self.editor_widget.isLoading():
+            try:
+                with open(self.editor_path, 'r', encoding='utf-8') as f:
+                    unchanged = f.read() == content
+            except (OSError, TypeError, UnicodeDecodeError):
+                unchanged = False
+            if not unchanged:
+                session['editor'] = {'path': self.editor_path, 'text': content}
+
+        home = os.path.expanduser('~')
+        try:
+            with open(os.path.join(home, '.nuclei_manager_session.json'), 'w', encoding='utf-8') as f:
+                json.dump(session, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存会话失败: {e}")
+
+        if self.sqlite_store or not self.yaml_folder_path or not self.poc_index.records:
+            return
+        # 旧版本的快照是 pickle 格式，加载时可执行任意代码，不再读取，顺便删除
+        legacy_file = os.path.join(home, '.nuclei_manager_session.pickle')
+        if os.path.exists(legacy_file):
+            try:
+                os.remove(legacy_file)
+            except OSError:
+                pass
+        # 快照只保存纯数据（记录按 rid 顺序排列），恢复时按顺序重建索引，rid 与列表位置一致
+        snapshot_file = os.path.join(home, '.nuclei_manager_snapshot.json')
+        snapshot = {
+            'version': self.SESSION_VERSION,
+            'folder': self.yaml_folder_path,
+            'records': list(self.poc_index.records.values()),
+            'states': self.file_states,
+            'results': self.savedResults(),
+        }
+        try:
+            with open(snapshot_file + '.tmp', 'w', encoding='utf-8') as f:
+                # YAML 中的日期等非 JSON 类型按字符串保存
+                json.dump(snapshot, f, ensure_ascii=False, default=str)
+            os.replace(snapshot_file + '.tmp', snapshot_file)
+        except Exception as e:
+            print(f"保存索引快照失败: {e}")
+
+    def savedResults(self):
+        """当前查询的结果 (查询文本, 结果在快照记录列表中的位置)；恢复时预先放入查询缓存，无需重新搜索"""
+        text = self.search_line_edit.text().strip()
+        if (not self.result_active or self.current_query is None or not text or text.startswith('re:')
+                or parseSearchQuery(text) != self.current_query):
+            return None
+        positions = {rid: position for position, rid in enumerate(self.poc_index.records)}
+        return (text, [positions[rid] for rid in self.currentRids()])
+
+    def sessionSplitters(self):
+        return [('main', self.main_splitter), ('table', self.table_splitter), ('bottom', self.bottom_splitter)]
+
+    def restoreLayout(self, session):
+        sizes = session.get('splitters', {})
+        for name, splitter in self.sessionSplitters():
+            value = sizes.get(name)
+            if isinstance(value, list) and len(value) == splitter.count() and all(isinstance(size, int) for size in value):
+                splitter.setSizes(value)
+
+    def restoreSnapshot(self, folder_path):
+        """用上次关闭时的索引快照立即显示界面，随后在后台与磁盘校验；快照不可用时返回 False"""
+        if self.sqlite_store:
+            return False
+        snapshot_file = os.path.join(os.path.expanduser('~'), '.nuclei_manager_snapshot.json')
+        try:
+            with open(snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != self.SESSION_VERSION or snapshot.get('folder') != folder_path:
+                return False
+            states = {path: tuple(state) for path, state in snapshot['states'].items()}
+            # 按保存时的顺序重建索引，rid 即记录在列表中的位置
+            self.poc_index.rebuild(snapshot['records'])
+            results = snapshot.get('results')
+            if results:
+                self.query_cache.put(parseSearchQuery(results[0]), self.poc_index.generation, results[1])
+        except Exception as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"读取索引快照失败: {e}")
+            return False
+
+        self.showRestoredIndex(folder_path, states)
+        self.statusBar().showMessage("已从上次的会话恢复，正在后台校验模板目录...")
+        return True
+
+    def showRestoredIndex(self, folder_path, states):
+        """索引已从快照或常驻缓存恢复：立即显示该目录，随后在后台与磁盘校验"""
+        self.yaml_folder_path = folder_path
+        self.yaml_data = list(self.poc_index.records.values())
+        self.filtered_yaml_data = []
+        self.result_active = False
+        self.file_states = states
+        self.onResultSetChanged()
+        self.applyOrdering()
+        self.updateTable()
+        self.total_files_label.setText(f"POC总数: {len(self.yaml_data)}")
+        self.applyPendingSession()
+
+        self.validate_thread = SessionValidateThread(folder_path, dict(self.file_states))
+        self.validate_thread.validated.connect(self.onSnapshotValidated)
+        self.validate_thread.start()
+
+    def onSnapshotValidated(self, changed, removed, states):
+        """把磁盘上的变化增量应用到快照恢复的索引，保持当前的查询、排序与选中行"""
+        thread = self.sender()
+        if thread is None or thread is not self.validate_thread:
+            return  # 校验期间已重新加载了目录（被淘汰的线程可能已在信号送达前销毁，sender() 为 None）
+        self.validate_thread = None
+        self.retireThread(thread)
+        if changed or removed:
+            view = self.captureViewState()
+            query = self.current_query if self.result_active else None
+            previous = self.currentRids() if query is not None else None
+            for file_path in removed:
+                rid = self.poc_index.ridForPath(file_path)
+                if rid is not None:
+                    self.poc_index.remove(rid)
+            touched = []
+            for data, content in changed:
+                rid = self.poc_index.ridForPath(data['file_path'])
+                if rid is None:
+                    rid = self.poc_index.add(data, content)
+                else:
+                    self.poc_index.update(rid, data, content)
+                touched.append(rid)
+            if query is not None:
+                # 只对变化的模板重新判断是否匹配，结果放入查询缓存，恢复视图时不必重新搜索全部模板
+                touched_set = set(touched)
+                records = self.poc_index.records
+                rids = [rid for rid in previous if rid in records and rid not in touched_set]
+                rids.extend(rid for rid in touched if self.poc_index.matchesQuery(rid, query))
+                rids.sort()
+                self.query_cache.put(query, self.poc_index.generation, rids)
+            self.yaml_data = list(self.poc_index.records.values())
+            self.applyViewState(view, load_editor=False)
+            self.total_files_label.setText(f"POC总数: {len(self.yaml_data)}")
+            self.statusBar().showMessage(f"模板目录校验完成: 更新 {len(changed)} 个，删除 {len(removed)} 个", 5000)
+        else:
+            self.statusBar().showMessage("模板目录校验完成: 与上次会话一致", 5000)
+        self.file_states = states
+        self.updateStatsBaseline()
+        self.schedulePrefetch()
+
+    def retireThread(self, thread):
+        """线程结束前保留引用，避免 QThread 在运行中被销毁"""
+        if thread.isRunning():
+            self.retired_threads.append(thread)
+            thread.finished.connect(lambda: self.retired_threads.remove(thread))
+
+    def captureViewState(self):
+        row = self.tableView.currentIndex().row()
+        return {
+            'query': self.search_line_edit.text(),
+            'ordering': self.ordering,
+            'sort_field': self.sort_field,
+            'sort_descending': self.sort_descending,
+            'column_filters': {str(column): text for column, text in self.column_filters.items() if text},
+            'selected': self.recordAtRow(row).get('file_path') if row >= 0 else None,
+            'top_row': self.tableView.rowAt(0),
+        }
+
+    def applyPendingSession(self):
+        """数据就绪后恢复上次会话的视图与未保存的编辑内容（只执行一次）"""
+        session, self.pending_session = self.pending_session, None
+        if not session:
+            return
+        self.applyViewState(session.get('view') or {})
+        editor = session.get('editor')
+        if editor and editor.get('text'):
+            self.editor_widget.loadContent(editor['text'])
+            self.editor_path = editor.get('path')
+            self.statusBar().showMessage("已恢复上次未保存的编辑内容", 5000)
+
+    def applyViewState(self, state, load_editor=True):
+        """恢复查询、排序、表头筛选、滚动位置与选中行；load_editor 为 False 时不改动编辑器内容"""
+        ordering = state.get('ordering', 'raw')
+        index = self.ordering_combo.findData(ordering)
+        self.ordering_combo.blockSignals(True)
+        self.ordering_combo.setCurrentIndex(max(index, 0))
+        self.ordering_combo.blockSignals(False)
+        self.ordering = ordering if index >= 0 else 'raw'
+        header = self.tableView.horizontalHeader()
+        sort_field = state.get('sort_field')
+        columns = {name: column for column, name in self.SORT_COLUMNS.items()}
+        if sort_field in columns and not self.sqlite_store:
+            self.sort_field = sort_field
+            self.sort_descending = bool(state.get('sort_descending'))
+            header.setSortIndicator(columns[sort_field], Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder)
+        else:
+            self.sort_field = None
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+
+        if not self.sqlite_store:
+            self.column_filters = {}
+            for column, editor in self.filter_header.editors.items():
+                text = (state.get('column_filters') or {}).get(str(column), '')
+                editor.blockSignals(True)
+                editor.setText(text)
+                editor.blockSignals(False)
+                if text:
+                    self.column_filters[column] = text
+            self.column_filter_bits = None
+            self.column_filter_generation = -1  # 由 searchTable 中的 onResultSetChanged 重新计算
+
+        query = state.get('query', '')
+        self.search_line_edit.blockSignals(True)
+        self.search_line_edit.setText(query)
+        self.search_line_edit.blockSignals(False)
+        self.searchTable(query, quiet=True)
+
+        top_row = state.get('top_row', -1)
+        if 0 <= top_row < self.table_model.rowCount():
+            self.tableView.scrollTo(self.table_model.index(top_row, 0), QAbstractItemView.PositionAtTop)
+        rid = self.poc_index.ridForPath(state.get('selected'))
+        if rid is not None and not self.sqlite_store:
+            rids = self.displayedRids()
+            row = next((row for row, candidate in enumerate(rids) if candidate == rid), -1)
+            if row >= 0:
+                self.selectRow(row)
+                if load_editor:
+                    self.onTableCellClicked(row)
 
     def selectFolder(self):
         # 如果没有历史记录，直接打开文件管理器
@@ -1118,14 +4808,70 @@ class NucleiPOCManager(QMainWindow):
             self.loadFolder(selected)
             self.saveFolderHistory(selected)
 
+    def stashFolderIndex(self):
+        """切换目录前把当前目录的索引放入常驻缓存（取出后当前索引为空）"""
+        if (self.sqlite_store or not self.yaml_folder_path or not self.poc_index.records
+                or (self.load_thread is not None and self.load_thread.isRunning())):
+            return  # 加载过程中索引仍属于上一个目录
+        state, contents = self.poc_index.detach()
+        self.folder_cache.put(self.yaml_folder_path, FolderIndexEntry(
+            state, contents, self.file_states, FolderIndexCache.estimateSize(self.file_states)))
+
+    def schedulePrefetch(self):
+        """当前目录就绪后，在后台预取历史记录中最近使用、尚未常驻内存的目录"""
+        self.cancelPrefetch()
+        if self.sqlite_store:
+            return
+        folders = [folder for folder in self.folder_history[:self.folder_cache.capacity + 1]
+                   if folder != self.yaml_folder_path and folder not in self.folder_cache and os.path.isdir(folder)]
+        if not folders:
+            return
+        self.prefetch_thread = FolderPrefetchThread(folders, self.folder_cache.memory_limit)
+        self.prefetch_thread.folderIndexed.connect(self.onFolderPrefetched)
+        self.prefetch_thread.start(QThread.IdlePriority)
+
+    def cancelPrefetch(self):
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancel()
+            self.retireThread(self.prefetch_thread)
+            self.prefetch_thread = None
+
+    def onFolderPrefetched(self, folder, entry):
+        if self.sender() is not self.prefetch_thread or folder == self.yaml_folder_path:
+            return
+        self.folder_cache.put(folder, entry)
+
     def loadFolder(self, folder_path):
+        self.cancelPrefetch()  # 让出 CPU 给前台加载
+        # 先取出目标目录再放入当前目录，避免缓存已满时目标目录被挤出；重新选择当前目录时取回刚放入的索引
+        entry = None if self.sqlite_store else self.folder_cache.take(folder_path)
+        self.stashFolderIndex()
+        if entry is None and not self.sqlite_store:
+            entry = self.folder_cache.take(folder_path)
         self.yaml_folder_path = folder_path
         self.yaml_data = []  # 清空旧数据
         self.filtered_yaml_data = []  # 清空过滤数据
+        self.result_active = False
+        self.file_states = {}
+        if self.validate_thread is not None:
+            # 重新加载后快照校验的结果不再适用
+            self.retireThread(self.validate_thread)
+            self.validate_thread = None
+
+        # 常驻内存的目录直接切换，随后在后台与磁盘校验
+        if entry is not None:
+            self.poc_index.restoreState(entry.state, entry.contents)
+            self.showRestoredIndex(folder_path, entry.states)
+            self.statusBar().showMessage("已切换到常驻内存的目录，正在后台校验模板目录...")
+            return
 
-        # 创建并启动加载POC的线程
-        self.load_thread = LoadPOCThread(folder_path)
-        self.load_thread.finished.connect(self.onLoadFinished)  # 连接信号
+        # 创建并启动加载POC的线程（SQLite 模式下只增量同步索引）
+        if self.sqlite_store:
+            self.load_thread = SqliteSyncThread(self.sqlite_store.db_path, folder_path)
+            self.load_thread.finished.connect(self.onSqliteSyncFinished)
+        else:
+            self.load_thread = LoadPOCThread(folder_path)
+            self.load_thread.finished.connect(self.onLoadFinished)  # 连接信号
         self.load_thread.progress.connect(self.updateProgress)  # 连接进度信号
 
         # 创建进度对话框
@@ -1168,163 +4914,256 @@ class NucleiPOCManager(QMainWindow):
         if value >= 100:
             self.progress_dialog.setLabelText("加载完成！")  # 加载完成时更新文本
 
-    def onLoadFinished(self, yaml_data):
+    def onLoadFinished(self, yaml_data, contents, states):
         self.progress_dialog.close()  # 关闭进度对话框
         self.yaml_data = yaml_data  # 更新POC数据
+        self.result_active = False
+        self.file_states = states
+        self.poc_index.rebuild(yaml_data, contents)  # 重建索引，旧的缓存结果随之失效
+        self.updateStatsBaseline()
+        self.onResultSetChanged()
+        self.applyOrdering()
         self.updateTable()  # 确保更新表格
-        self.updatePageInfo()  # 更新分页信息
         self.total_files_label.setText(f"POC总数: {len(self.yaml_data)}")
+        self.applyPendingSession()
+        self.schedulePrefetch()
+
+    def onSqliteSyncFinished(self, total):
+        self.progress_dialog.close()
+        self.yaml_data = []  # SQLite 模式下不在内存中保留 yaml_data
+        self.poc_index.rebuild([])
+        self.sqlite_query = ('OR', ())
+        self.sqlite_result_count = total
+        self.tableView.scrollToTop()
+        self.onResultSetChanged()
+        self.updateTable()
+        self.total_files_label.setText(f"POC总数: {total}")
+        self.applyPendingSession()
+
+    def currentData(self):
+        return self.filtered_yaml_data if self.result_active else self.yaml_data
+
+    def resultCount(self):
+        if self.sqlite_store:
+            return self.sqlite_result_count
+        return len(self.currentData())
+
+    def recordAtRow(self, row):
+        """返回表格第 row 行对应的记录"""
+        return self.table_model.record(row)
+
+    def currentRids(self):
+        """当前结果集的 rid 列表（原始顺序）"""
+        if self.result_active:
+            rid_for_path = self.poc_index.rid_by_path
+            return [rid_for_path[item.get('file_path')] for item in self.filtered_yaml_data
+                    if item.get('file_path') in rid_for_path]
+        return list(self.poc_index.records)
+
+    def applyOrdering(self, rids=None):
+        """按排序方式准备结果顺序：表头排序优先；相关度排序只在查询包含关键词时生效"""
+        self.ranked_results = None
+        self.display_rids = None
+        if self.sqlite_store:
+            return
+        if self.column_filter_bits is not None:
+            # 表头筛选与当前结果集求交，保持原始顺序
+            if rids is not None:
+                base_bits = ridsToBits(rids)
+            elif self.result_active:
+                base_bits = ridsToBits(self.currentRids())
+            else:
+                base_bits = self.poc_index.all_bits
+            rids = bitsToRids(base_bits & self.column_filter_bits)
+        field, descending = self.activeSortField()
+        if field is not None:
+            if rids is None and self.result_active:
+                rids = self.currentRids()
+            self.display_rids = self.sort_index.sortedRids(field, rids, descending)
+            return
+        if self.ordering == 'relevance' and self.current_query and self.current_query.terms:
+            if rids is None:
+                rids = self.currentRids()
+            self.ranked_results = self.poc_index.relevance.rank(rids, self.current_query.terms)
+            return
+        if self.column_filter_bits is not None:
+            self.display_rids = rids
+
+    def activeSortField(self):
+        """当前生效的排序字段 (字段, 是否降序)：表头排序优先，其次是 CVSS 排序方式，都没有时字段为 None"""
+        if self.sort_field is not None:
+            return self.sort_field, self.sort_descending
+        if self.ordering == 'cvss':
+            return 'cvss', True
+        return None, False
+
+    def displayedRids(self):
+        """表格当前显示的 rid，顺序与表格一致"""
+        if self.display_rids is not None:
+            return self.display_rids
+        if self.ranked_results is not None:
+            return self.ranked_results.prefix(len(self.ranked_results))
+        return self.currentRids()
+
+    def onColumnFilterChanged(self, column, text):
+        if self.sqlite_store:
+            self.statusBar().showMessage("SQLite 索引模式暂不支持表头筛选", 3000)
+            return
+        self.column_filters[column] = text
+        started = time.perf_counter()
+        self.refreshColumnFilter()
+        self.onResultSetChanged()
+        self.applyOrdering()
+        self.updateTable()
+        if self.column_filter_bits is not None:
+            self.statusBar().showMessage(
+                f"表头筛选: {self.table_model.rowCount()} 行，耗时 {(time.perf_counter() - started) * 1000:.1f} ms", 3000)
+
+    def clearColumnFilters(self):
+        self.filter_header.clearFilters()
+        self.column_filters = {}
+        self.column_filter_bits = None
+
+    def refreshColumnFilter(self):
+        """根据各列筛选文本计算位图：同一列中逗号或空格分隔的多个值取并集，不同列之间取交集"""
+        self.column_filter_generation = self.poc_index.generation
+        bits = None
+        for column, text in self.column_filters.items():
+            tokens = [token for token in re.split(r'[,，\s]+', text.strip().lower()) if token]
+            if not tokens:
+                continue
+            field = self.FILTER_COLUMNS[column][0]
+            column_bits = 0
+            for token in tokens:
+                if field == 'severity':
+                    column_bits |= self.severityBits(token)
+                else:
+                    column_bits |= self.poc_index.substringBits(field, token)
+            bits = column_bits if bits is None else bits & column_bits
+        self.column_filter_bits = bits
+
+    def severityBits(self, token):
+        """危害等级是固定的几个取值：精确匹配取值或中文名，否则按前缀匹配（输入到一半的 cri 即 critical）"""
+        postings = self.poc_index.postings['severity']
+        value = self.SEVERITY_VALUES.get(token, token)
+        if value in postings:
+            return postings[value]
+        bits = 0
+        for value, value_bits in postings.items():
+            if value.startswith(token):
+                bits |= value_bits
+        for label, value in self.SEVERITY_VALUES.items():
+            if label.startswith(token):
+                bits |= postings.get(value, 0)
+        return bits
+
+    def onOrderingChanged(self, index):
+        self.ordering = self.ordering_combo.itemData(index)
+        # 选择排序方式时取消表头排序
+        self.sort_field = None
+        self.tableView.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.applyOrdering()
+        self.tableView.scrollToTop()
+        self.updateTable()
 
-    def updateTable(self):
-        self.tableWidget.setRowCount(0)  # 清空表格行
-        data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-
-        # 计算当前页的起始和结束索引
-        start = (self.current_page - 1) * self.rows_per_page
-        end = min(start + self.rows_per_page, len(data))
-
-        # 设置表格行数
-        self.tableWidget.setRowCount(end - start)
-
-        severity_map = {
-            'critical': '严重',
-            'high': '高危',
-            'medium': '中危',
-            'low': '低危',
-            'info': '信息'
-        }
-
-        color_map = {
-            'critical': QColor("#FF0000"),  # 红色
-            'high': QColor("#FFA500"),  # 橙色
-            'medium': QColor("#FFD700"),  # 金色
-            'low': QColor("#008000"),  # 绿色
-            'info': QColor("#0000FF")  # 色
-        }
-
-        for row, item in enumerate(data[start:end]):
-            info = item.get('info', {})
-
-            self.tableWidget.setItem(row, 0, QTableWidgetItem(str(start + row + 1)))
-            self.tableWidget.setItem(row, 1, QTableWidgetItem(item.get('original_filename', '')))  # 这里将显示相对路径
-
-            severity = severity_map.get(info.get('severity', '').lower(), info.get('severity', ''))
-            severity_item = QTableWidgetItem(severity)
-            severity_item.setForeground(color_map.get(info.get('severity', '').lower(), QColor("#000000")))  # 设置字体颜色
-            self.tableWidget.setItem(row, 2, severity_item)
-
-            self.tableWidget.setItem(row, 3, QTableWidgetItem(info.get('author', '')))
-
-            tags = info.get('tags', [])
-            if isinstance(tags, list):
-                tags = ', '.join(tags)
-            self.tableWidget.setItem(row, 4, QTableWidgetItem(str(tags)))
-
-            cve = info.get('classification', {}).get('cve-id', '')
-            self.tableWidget.setItem(row, 5, QTableWidgetItem(str(cve)))
-
-            reference = info.get('reference', [])
-            if isinstance(reference, list) and reference:
-                reference = reference[0]
-            self.tableWidget.setItem(row, 6, QTableWidgetItem(str(reference)))
-
-            self.tableWidget.setItem(row, 7, QTableWidgetItem(info.get('description', '')))
-
-        # 更新分页信息
-        self.updatePageInfo()
-
-    def updatePageInfo(self):
-        data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-        total_pages = max(1, (len(data) + self.rows_per_page - 1) // self.rows_per_page)
-        self.page_label.setText(f"第 {self.current_page} / {total_pages} 页")
-
-        self.prev_page_btn.setEnabled(self.current_page > 1)
-        self.next_page_btn.setEnabled(self.current_page < total_pages)
-
-    def prevPage(self):
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.updateTable()
-            self.updatePageInfo()
-
-    def nextPage(self):
-        data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-        total_pages = (len(data) + self.rows_per_page - 1) // self.rows_per_page
-
-        if self.current_page < total_pages:
-            self.current_page += 1
-            self.updateTable()
-            self.updatePageInfo()
-
-    def gotoPage(self):
-        try:
-            page = int(self.page_input.text())
-            data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-            total_pages = (len(data) + self.rows_per_page - 1) // self.rows_per_page
-
-            if 1 <= page <= total_pages:
-                self.current_page = page
-                self.updateTable()
-                self.updatePageInfo()
+    def onHeaderClicked(self, column):
+        header = self.tableView.horizontalHeader()
+        field = self.SORT_COLUMNS.get(column)
+        if field is None or self.sqlite_store:
+            # 该列不支持排序（SQLite 模式下均不支持），恢复原来的指示
+            if self.sort_field is None:
+                header.setSortIndicator(-1, Qt.AscendingOrder)
             else:
-                QMessageBox.warning(self, "警告", f"页码必须在 1 到 {total_pages} 之间")
-        except ValueError:
-            QMessageBox.warning(self, "警告", "请输入有效的页码")
+                sort_column = next(col for col, name in self.SORT_COLUMNS.items() if name == self.sort_field)
+                header.setSortIndicator(sort_column, Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder)
+            if self.sqlite_store:
+                self.statusBar().showMessage("SQLite 索引模式暂不支持按列排序", 3000)
+            return
+        self.sort_descending = self.sort_field == field and not self.sort_descending
+        self.sort_field = field
+        header.setSortIndicator(column, Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder)
+        self.ordering_combo.blockSignals(True)
+        self.ordering_combo.setCurrentIndex(0)
+        self.ordering_combo.blockSignals(False)
+        self.ordering = 'raw'
+        started = time.perf_counter()
+        self.applyOrdering()
+        self.updateTable()
+        self.statusBar().showMessage(
+            f"排序 {self.table_model.rowCount()} 行，耗时 {(time.perf_counter() - started) * 1000:.1f} ms", 3000)
+
+    def updateTable(self):
+        """按当前结果集与排序方式重置表格模型，行记录在视图绘制时才按需读取"""
+        if self.sqlite_store:
+            pages = SqlitePageCache(self.sqlite_store, self.yaml_folder_path, self.sqlite_query)
+            self.table_model.setRows(self.sqlite_result_count, pages.record)
+        elif self.display_rids is not None:
+            display_rids = self.display_rids
+            records = self.poc_index.records
+            values = self.display_cache.values
+            self.table_model.setRows(len(display_rids), lambda row: records[display_rids[row]],
+                                     lambda row: values[display_rids[row]])
+        elif self.ranked_results is not None:
+            ranked = self.ranked_results
+            records = self.poc_index.records
+            values = self.display_cache.values
+            self.table_model.setRows(len(ranked), lambda row: records[ranked.at(row)],
+                                     lambda row: values[ranked.at(row)])
+        else:
+            data = self.currentData()
+            rid_by_path = self.poc_index.rid_by_path
+            values = self.display_cache.values
+            self.table_model.setRows(len(data), data.__getitem__,
+                                     lambda row: values.get(rid_by_path.get(data[row].get('file_path')))
+                                     or PocTableModel.recordValues(data[row]))
 
     def onTableCellClicked(self, row):
         try:
-            self.highlightRow(row)  # 添加此行以高亮选中行
-            data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-            start = (self.current_page - 1) * self.rows_per_page
-            item = data[start + row]
+            item = self.recordAtRow(row)
             file_path = item.get('file_path')
 
             if file_path and os.path.exists(file_path):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
-                    self.editor_widget.editor.setPlainText(content)
+                    self.editor_widget.loadContent(content)
+                self.editor_path = file_path
+                if self.editor_widget.isLoading():
+                    self.statusBar().showMessage("正在分块加载大文件...")
         except Exception as e:
             QMessageBox.critical(self, "错误", f"无法加载POC内容: {str(e)}")
 
-    def highlightRow(self, row):
-        """高亮选中行"""
-        # 清除之前高亮的行
-        for r in range(self.tableWidget.rowCount()):
-            for column in range(self.tableWidget.columnCount()):
-                item = self.tableWidget.item(r, column)
-                if item:
-                    # 恢复为交���行颜色或白色背景
-                    if r % 2 == 0:
-                        item.setBackground(QColor(255, 255, 255))  # 偶数行恢复为白色
-                    else:
-                        item.setBackground(QColor(240, 240, 240))  # 奇数行恢复为浅灰色
+    def restoreSelection(self, row, file_path):
+        """模型重置后，若第 row 行仍是同一文件则恢复选中，继续编辑时仍保存到该文件"""
+        if row >= 0 and self.recordAtRow(row).get('file_path') == file_path:
+            self.selectRow(row)
 
-        # 高亮当前行
-        for column in range(self.tableWidget.columnCount()):
-            item = self.tableWidget.item(row, column)
-            if item:
-                item.setBackground(QColor(220, 220, 255))  # 设置为浅蓝色
+    def selectRow(self, row):
+        """通过选择模型选中并定位到第 row 行"""
+        if 0 <= row < self.table_model.rowCount():
+            index = self.table_model.index(row, 0)
+            self.tableView.selectionModel().setCurrentIndex(
+                index, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+            self.tableView.scrollTo(index)
 
     def showContextMenu(self, position):
         menu = QMenu()
         copy_name = menu.addAction("复制文件名")
         copy_path = menu.addAction("复制文件路径")
         open_location = menu.addAction("打开文件位置")
+        similar_action = menu.addAction("查找相似模板")
         menu.addSeparator()
         delete_action = menu.addAction("删除文件")
 
-        action = menu.exec_(self.tableWidget.mapToGlobal(position))
+        action = menu.exec_(self.tableView.viewport().mapToGlobal(position))
         if not action:
             return
 
-        item = self.tableWidget.itemAt(position)
-        if not item:
+        index = self.tableView.indexAt(position)
+        if not index.isValid():
             return
 
-        row = item.row()
-        start = (self.current_page - 1) * self.rows_per_page
-        data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-        file_data = data[start + row]
+        row = index.row()
+        file_data = self.recordAtRow(row)
         file_path = file_data.get('file_path')
         file_name = file_data.get('original_filename')
 
@@ -1346,9 +5185,86 @@ class NucleiPOCManager(QMainWindow):
                     subprocess.run(['xdg-open', folder_path])
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"无法打开文件位置: {str(e)}")
+        elif action == similar_action:
+            self.findSimilarToRecord(file_data)
         elif action == delete_action:
             self.deleteFile(row, file_name, file_path)
 
+    def findSimilarToRecord(self, record):
+        """查找与选中模板相似的模板"""
+        rid = self.poc_index.ridForPath(record.get('file_path'))
+        if rid is None:
+            QMessageBox.warning(self, "提示", "相似模板查找需要内存索引（SQLite 索引模式下不可用）")
+            return
+        self.showSimilarTemplates(similarityTokens(record, self.poc_index.fields.get(rid)), exclude=rid)
+
+    def findSimilarToText(self, content):
+        """查找与编辑器内容相似的模板，内容无法解析为 YAML 时按纯文本分词"""
+        if not self.poc_index.records:
+            QMessageBox.warning(self, "提示", "相似模板查找需要内存索引（SQLite 索引模式下不可用）")
+            return
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError:
+            data = None
+        if isinstance(data, dict):
+            tokens = similarityTokens(data)
+        else:
+            tokens = similarityTokens({'info': {'description': content}})
+        self.showSimilarTemplates(tokens)
+
+    def showSimilarTemplates(self, tokens, exclude=None):
+        started = time.perf_counter()
+        results = self.poc_index.similarity.topK(tokens, k=20, exclude=exclude)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        dialog = SimilarTemplatesDialog(results, self.poc_index.records, elapsed_ms, self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.showRids(dialog.rids)
+
+    def showQuickOpen(self):
+        if self.sqlite_store:
+            QMessageBox.warning(self, "提示", "SQLite 模式下不支持快速打开，请使用全局搜索")
+            return
+        dialog = QuickOpenDialog(self.quick_index, self.poc_index.records, self)
+        geometry = self.geometry()
+        dialog.move(geometry.x() + (geometry.width() - dialog.minimumWidth()) // 2, geometry.y() + 60)
+        dialog.input.setFocus()
+        if dialog.exec_() == QDialog.Accepted and dialog.rid is not None:
+            self.showRids([dialog.rid])
+            self.selectRow(0)
+            self.onTableCellClicked(0)
+
+    def onDirectorySelected(self, current, previous):
+        if not current.isValid():
+            return
+        rids = self.directory_model.subtreeRids(current.sibling(current.row(), 0))
+        self.cancelRegexSearch()
+        self.showRids(rids)
+        if len(rids) == 1 and isinstance(current.internalPointer(), FileLeaf):
+            self.selectRow(0)
+            self.onTableCellClicked(0)
+        self.statusBar().showMessage(f"目录树: 当前结果集 {len(rids)} 个模板（批量运行将使用这些模板）", 5000)
+
+    def showRids(self, rids):
+        """以给定顺序把一组记录设为当前结果集；有表头排序或 CVSS 排序时按排序字段重排，与 applyOrdering 一致"""
+        self.filtered_yaml_data = [self.poc_index.get(rid) for rid in rids]
+        self.result_active = True
+        self.onResultSetChanged(rids)
+        self.current_query = None
+        self.ranked_results = None
+        self.display_rids = None
+        if self.column_filter_bits is not None:
+            # 保持给定顺序，只去掉被表头筛选排除的记录
+            kept = set(bitsToRids(ridsToBits(rids) & self.column_filter_bits))
+            self.display_rids = [rid for rid in rids if rid in kept]
+        field, descending = self.activeSortField()
+        if field is not None:
+            shown = self.display_rids if self.display_rids is not None else rids
+            self.display_rids = self.sort_index.sortedRids(field, shown, descending)
+        self.tableView.scrollToTop()
+        self.updateTable()
+
     def deleteFile(self, row, file_name, file_path):
         reply = QMessageBox.question(self, '确认删除',
                                      f"确定要删除文件 {file_name} 吗？",
@@ -1357,68 +5273,371 @@ class NucleiPOCManager(QMainWindow):
         if reply == QMessageBox.Yes:
             try:
                 os.remove(file_path)
-                start = (self.current_page - 1) * self.rows_per_page
-                if self.filtered_yaml_data:
-                    self.filtered_yaml_data.pop(start + row)
+                if self.sqlite_store:
+                    self.sqlite_store.removePath(file_path)
+                    self.sqlite_result_count = self.sqlite_store.count(self.yaml_folder_path, self.sqlite_query)
+                    self.updateTable()
+                    self.total_files_label.setText(
+                        f"POC总数: {self.sqlite_store.count(self.yaml_folder_path)}")
+                    return
+                # 按路径而不是行号移除，行号在相关度排序下不对应 filtered_yaml_data 的位置
+                if self.result_active:
+                    self.filtered_yaml_data = [x for x in self.filtered_yaml_data if x.get('file_path') != file_path]
                 self.yaml_data = [x for x in self.yaml_data if x.get('file_path') != file_path]
+                rid = self.poc_index.ridForPath(file_path)
+                if rid is not None:
+                    self.poc_index.remove(rid)
+                self.file_states.pop(file_path, None)
+                self.onResultSetChanged()
+                self.applyOrdering()
                 self.updateTable()
-                self.updatePageInfo()
                 self.total_files_label.setText(f"POC总数: {len(self.yaml_data)}")
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"删除文件失败: {str(e)}")
 
-    def searchTable(self, keyword):
+    def exportResults(self):
+        """把表格中的结果（与表格相同的列和顺序，另加完整路径）导出到文件"""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.warning(self, "导出", "上一次导出尚未完成")
+            return
+        filters = list(ExportResultsThread.FORMATS.items())
+        file_path, selected = QFileDialog.getSaveFileName(self, "导出结果", "nuclei_results.csv",
+                                                          ";;".join(title for _, title in filters))
+        if not file_path:
+            return
+        extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+        if extension == 'json':
+            extension = 'jsonl'
+        if extension not in ExportResultsThread.FORMATS:
+            extension = next((fmt for fmt, title in filters if title == selected), 'csv')
+            file_path += '.' + extension
+
+        if self.sqlite_store:
+            # 工作线程使用独立连接，按与表格相同的 rid 顺序读取
+            total = self.sqlite_result_count
+            db_path = self.sqlite_store.db_path
+            where, params = self.sqlite_store.whereClause(self.yaml_folder_path, self.sqlite_query)
+
+            def records():
+                conn = SqlitePocStore.connect(db_path)
+                try:
+                    yield from SqlitePocStore.iterRecords(conn, where, params)
+                finally:
+                    conn.close()
+        else:
+            rids = array('I', self.displayedRids())  # 快照，导出期间表格可以继续变化
+            total = len(rids)
+            index_records = self.poc_index.records
+
+            def records():
+                for rid in rids:
+                    record = index_records.get(rid)  # 导出期间被删除的模板跳过
+                    if record is not None:
+                        yield record
+
+        if not total:
+            QMessageBox.warning(self, "导出", "当前没有可导出的结果")
+            return
+
+        self.export_thread = ExportResultsThread(file_path, extension, total, records)
+        self.export_dialog = QProgressDialog(f"正在导出 {total} 条结果...", "取消", 0, 100, self)
+        self.export_dialog.setWindowTitle("导出结果")
+        self.export_dialog.setMinimumDuration(500)
+        self.export_dialog.canceled.connect(self.export_thread.cancel)
+        self.export_thread.progress.connect(self.export_dialog.setValue)
+        self.export_thread.exportFinished.connect(self.onExportFinished)
+        self.export_thread.start()
+
+    def onExportFinished(self, count, error):
+        self.export_dialog.close()
+        if error:
+            QMessageBox.warning(self, "导出失败", error)
+        elif self.export_thread.interrupted:
+            self.statusBar().showMessage("导出已取消", 3000)
+        else:
+            self.statusBar().showMessage(f"已导出 {count} 条结果到 {self.export_thread.file_path}", 5000)
+
+    def searchTable(self, keyword, quiet=False):
         self.search_keyword = keyword
+        self.cancelRegexSearch()
+
+        if keyword.strip().startswith('re:'):
+            self.startRegexSearch(keyword.strip()[3:].strip())
+            return
+
         self.filtered_yaml_data = []
+        query = parseSearchQuery(keyword)
+
+        if self.sqlite_store:
+            # SQLite 模式：由 FTS5 回答，表格滚动时再按块取行
+            if query.ranges or query.facets or query.structs:
+                QMessageBox.warning(self, "提示", "SQLite 索引模式暂不支持数值范围、分面与结构化过滤，已忽略")
+            self.sqlite_query = (query.operator, query.terms)
+            self.sqlite_result_count = self.sqlite_store.count(self.yaml_folder_path, self.sqlite_query)
+            self.tableView.scrollToTop()
+            self.updateTable()
+            if keyword and not quiet:
+                QMessageBox.information(self, "搜索结果", f"找到 {self.sqlite_result_count} 个匹配项")
+            return
 
+        rids = None
+        self.current_query = query
+        self.result_active = bool(keyword)
         if not keyword:
             self.filtered_yaml_data = self.yaml_data
         else:
-            keywords = keyword.split()
-            use_and = 'AND' in keywords
-            if use_and:
-                keywords.remove('AND')
-            elif 'OR' in keywords:
-                keywords.remove('OR')
-                use_and = False
-
-            for item in self.yaml_data:
-                yaml_str = yaml.dump(item, allow_unicode=True).lower()
-                if use_and:
-                    if all(kw.lower() in yaml_str for kw in keywords):
-                        self.filtered_yaml_data.append(item)
-                else:
-                    if any(kw.lower() in yaml_str for kw in keywords):
-                        self.filtered_yaml_data.append(item)
+            generation = self.poc_index.generation
+            rids = self.query_cache.get(query, generation)
+
+            if rids is None:
+                rids = self.poc_index.search(query)
+                self.query_cache.put(query, generation, rids)
+
+            self.filtered_yaml_data = [self.poc_index.get(rid) for rid in rids]
 
-        self.current_page = 1
+        self.onResultSetChanged(rids)
+        self.applyOrdering(rids)
+        self.tableView.scrollToTop()
         self.updateTable()
-        self.updatePageInfo()
 
         result_count = len(self.filtered_yaml_data)
-        if keyword:
+        if keyword and not quiet:
             QMessageBox.information(self, "搜索结果", f"找到 {result_count} 个匹配项")
 
+    def startRegexSearch(self, pattern):
+        """正则搜索模式：正则只编译一次，在进程池中并行扫描原文，命中结果流式加入表格"""
+        if self.sqlite_store:
+            QMessageBox.warning(self, "提示", "正则搜索需要内存索引（SQLite 索引模式下不可用）")
+            return
+        flags = re.MULTILINE
+        try:
+            re.compile(pattern, flags)
+        except re.error as e:
+            QMessageBox.warning(self, "正则错误", f"无效的正则表达式: {e}")
+            return
+
+        self.filtered_yaml_data = []
+        self.result_active = True
+        self.current_query = None
+        self.ranked_results = None
+        self.display_rids = None
+        self.tableView.scrollToTop()
+        self.onResultSetChanged([])
+        self.updateTable()
+
+        items = self.poc_index.contentItems()
+        if not items:
+            return
+        self.regex_search_id += 1
+        self.regex_started = time.perf_counter()
+        self.regex_thread = RegexSearchThread(self.regex_search_id, pattern, flags, items, self.regex_workers)
+        self.regex_thread.hitsFound.connect(self.onRegexHits)
+        self.regex_thread.searchFinished.connect(self.onRegexFinished)
+        self.regex_thread.start()
+        self.statusBar().showMessage("正则搜索中...")
+
+    def cancelRegexSearch(self):
+        thread = self.regex_thread
+        self.regex_thread = None
+        if thread and thread.isRunning():
+            thread.cancel()
+            self.retireThread(thread)
+
+    def onRegexHits(self, search_id, rids):
+        if search_id != self.regex_search_id:
+            return  # 已被新的搜索取代
+        before = len(self.filtered_yaml_data)
+        self.filtered_yaml_data.extend(self.poc_index.get(rid) for rid in rids if rid in self.poc_index.records)
+        self.table_model.appendRows(len(self.filtered_yaml_data) - before)
+        self.statusBar().showMessage(f"正则搜索中... 已命中 {len(self.filtered_yaml_data)} 个")
+
+    def onRegexFinished(self, search_id, skipped, aborted):
+        if search_id != self.regex_search_id:
+            return
+        # 流式结果按完成顺序到达，结束后恢复原始顺序
+        rids = sorted(self.currentRids())
+        self.filtered_yaml_data = [self.poc_index.get(rid) for rid in rids]
+        self.onResultSetChanged(rids)
+        self.applyOrdering(rids)
+        self.updateTable()
+        elapsed = time.perf_counter() - self.regex_started
+        message = f"正则搜索完成: 命中 {len(rids)} 个，耗时 {elapsed:.1f} 秒"
+        if skipped:
+            message += f"，{skipped} 个模板因超出时间预算未检查"
+        self.statusBar().showMessage(message)
+        if aborted:
+            QMessageBox.warning(self, "正则搜索", "正则表达式执行超时（可能存在灾难性回溯），搜索已中止，结果不完整")
+
+    def onResultSetChanged(self, rids=None):
+        """结果集变化后更新结果位图、分面统计、智能集合计数、调试面板与统计面板"""
+        if rids is not None:
+            self.result_bits = ridsToBits(rids)
+        elif self.result_active:
+            self.result_bits = ridsToBits(self.currentRids())
+        else:
+            self.result_bits = self.poc_index.all_bits
+        if self.column_filters and self.column_filter_generation != self.poc_index.generation:
+            self.refreshColumnFilter()  # 索引变化后重新计算表头筛选
+        if self.column_filter_bits is not None:
+            self.result_bits &= self.column_filter_bits
+        self.facet_panel.setCounts(self.poc_index.facetCounts(self.result_bits))
+        if self.collections_generation != self.poc_index.generation:
+            self.refreshCollectionCombo()
+        self.refreshDebugPanel()
+        self.refreshStatsPanel()
+
+    def refreshCollectionCombo(self):
+        """重新填充智能集合下拉框，显示各集合当前成员数"""
+        self.collections_generation = self.poc_index.generation
+        current = self.collection_combo.currentData()
+        self.collection_combo.blockSignals(True)
+        self.collection_combo.clear()
+        self.collection_combo.addItem("智能集合", None)
+        for name in self.collections.names():
+            if self.sqlite_store:
+                self.collection_combo.addItem(name, name)
+            else:
+                self.collection_combo.addItem(f"{name} ({len(self.collections.members[name])})", name)
+        index = self.collection_combo.findData(current)
+        self.collection_combo.setCurrentIndex(max(index, 0))
+        self.collection_combo.blockSignals(False)
+
+    def openCollection(self, index):
+        name = self.collection_combo.itemData(index)
+        if name is None:
+            return
+        text = self.collections.queries[name]
+        self.search_line_edit.blockSignals(True)
+        self.search_line_edit.setText(text)
+        self.search_line_edit.blockSignals(False)
+        if self.sqlite_store:
+            # SQLite 模式不在内存中保留记录，退回为执行查询
+            self.searchTable(text)
+            return
+        self.cancelRegexSearch()
+        self.search_keyword = text
+        self.showRids(self.collections.rids(name))
+        self.current_query = self.collections.parsed[name]
+        if self.ordering != 'raw' or self.sort_field is not None:
+            self.applyOrdering()
+            self.updateTable()
+
+    def saveCurrentSearch(self):
+        text = self.search_line_edit.text().strip()
+        if not text:
+            QMessageBox.warning(self, "警告", "请先输入要保存的搜索条件")
+            return
+        if text.startswith('re:'):
+            QMessageBox.warning(self, "警告", "正则搜索不支持保存为智能集合")
+            return
+        name, ok = QInputDialog.getText(self, "保存搜索", "集合名称:",
+                                        text=self.collection_combo.currentData() or '')
+        name = name.strip()
+        if not ok or not name:
+            return
+        if name in self.collections.queries:
+            reply = QMessageBox.question(self, '确认覆盖', f"集合 {name} 已存在，是否覆盖？",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        self.collections.put(name, text, self.poc_index)
+        self.refreshCollectionCombo()
+        self.collection_combo.setCurrentIndex(self.collection_combo.findData(name))
+
+    def deleteCollection(self):
+        name = self.collection_combo.currentData()
+        if name is None:
+            QMessageBox.warning(self, "警告", "请先在下拉框中选择要删除的集合")
+            return
+        reply = QMessageBox.question(self, '确认删除', f"确定要删除集合 {name} 吗？",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.collections.delete(name)
+            self.refreshCollectionCombo()
+
+    def refineWithFacet(self, field, value):
+        """点击分面取值：在当前查询后追加分面过滤并重新搜索"""
+        token = f'{field}:{value}'
+        if ' ' in value or '"' in value:
+            token = f'{field}:"{value}"'
+        text = self.search_line_edit.text().strip()
+        if f'{field}:{value}' not in splitQueryTokens(text):
+            text = f'{text} {token}'.strip()
+        self.search_line_edit.setText(text)
+        self.searchTable(text)
+
     def onSearchTextChanged(self, text):
         if not text:
             self.searchTable('')
 
+    def completionToken(self):
+        """返回 (光标前最后一个词的起始位置, 该词)"""
+        text = self.search_line_edit.text()[:self.search_line_edit.cursorPosition()]
+        start = max(text.rfind(' '), text.rfind('\t')) + 1
+        return start, text[start:]
+
+    def updateCompletions(self, text):
+        _, token = self.completionToken()
+        popup = self.search_completer.popup()
+        if text.lstrip().startswith('re:') or len(token) < 1 or token in ('AND', 'OR', 'and', 'or'):
+            popup.hide()
+            return
+        completions = self.term_dictionary.complete(token)
+        if not completions or completions == [token.lower()]:
+            popup.hide()
+            return
+        self.completion_model.setStringList(completions)
+        self.search_completer.complete()
+        popup.setCurrentIndex(self.completion_model.index(-1, 0))
+
+    def insertCompletion(self, completion):
+        start, token = self.completionToken()
+        text = self.search_line_edit.text()
+        rest = text[start + len(token):].lstrip(' ')
+        self.search_line_edit.setText(text[:start] + completion + ' ' + rest)
+        self.search_line_edit.setCursorPosition(start + len(completion) + 1)
+
     def resetSearch(self):
+        self.cancelRegexSearch()
         self.search_line_edit.clear()
+        self.clearColumnFilters()
         self.filtered_yaml_data = []
-        self.current_page = 1
+        self.result_active = False
+        self.current_query = None
+        if self.sqlite_store and self.yaml_folder_path:
+            self.sqlite_query = ('OR', ())
+            self.sqlite_result_count = self.sqlite_store.count(self.yaml_folder_path)
+        self.onResultSetChanged()
+        self.applyOrdering()
+        self.tableView.scrollToTop()
         self.updateTable()
-        self.updatePageInfo()
 
     def saveYamlContent(self):
+        if self.editor_widget.isLoading():
+            QMessageBox.warning(self, "警告", "大文件仍在加载中，请加载完成后再保存")
+            return
         content = self.editor_widget.editor.toPlainText()
         if not content.strip():
             QMessageBox.warning(self, "警告", "编辑器内容为空")
             return
 
+        # 写入前校验：YAML 无法解析时不保存，缺少必填字段时由用户确认
+        issues = validateTemplate(content)
+        self.editor_widget.showIssues(issues)
+        fatal = [issue for issue in issues if issue.fatal]
+        if fatal:
+            QMessageBox.warning(self, "无法保存", f"第 {fatal[0].line + 1} 行: {fatal[0].message}")
+            return
+        if issues:
+            summary = '\n'.join(f"第 {issue.line + 1} 行: {issue.message}" for issue in issues)
+            reply = QMessageBox.question(self, "模板校验", f"{summary}\n\n仍然保存？",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply == QMessageBox.No:
+                return
+
         content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
 
-        selected_row = self.tableWidget.currentRow()
+        selected_row = self.tableView.currentIndex().row()
         is_new_file = selected_row < 0
 
         if is_new_file:
@@ -1431,9 +5650,7 @@ class NucleiPOCManager(QMainWindow):
             if not file_name.endswith('.yaml'):
                 file_name += '.yaml'
         else:
-            start = (self.current_page - 1) * self.rows_per_page
-            data = self.filtered_yaml_data if self.filtered_yaml_data else self.yaml_data
-            file_name = data[start + selected_row].get('original_filename')
+            file_name = self.recordAtRow(selected_row).get('original_filename')
 
         try:
             file_path = os.path.join(self.yaml_folder_path, file_name)
@@ -1447,30 +5664,56 @@ class NucleiPOCManager(QMainWindow):
 
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            self.editor_path = file_path
 
             yaml_data = yaml.safe_load(content)
             yaml_data['original_filename'] = file_name
             yaml_data['file_path'] = file_path
 
-            if is_new_file:
+            if self.sqlite_store:
+                self.sqlite_store.upsertFile(self.yaml_folder_path, file_path, content, yaml_data)
+                self.sqlite_result_count = self.sqlite_store.count(self.yaml_folder_path, self.sqlite_query)
+                self.updateTable()
+                self.restoreSelection(selected_row, file_path)
+                self.total_files_label.setText(f"POC总数: {self.sqlite_store.count(self.yaml_folder_path)}")
+                QMessageBox.information(self, "成功", f"文件已保存: {file_name}")
+                return
+
+            self.file_states[file_path] = fileState(file_path)
+            rid = self.poc_index.ridForPath(file_path)
+            if is_new_file and rid is None:
                 self.yaml_data.append(yaml_data)
+                self.poc_index.add(yaml_data, content)
             else:
-                start = (self.current_page - 1) * self.rows_per_page
-                if self.filtered_yaml_data:
-                    self.filtered_yaml_data[start + selected_row] = yaml_data
+                if self.result_active:
+                    for i, item in enumerate(self.filtered_yaml_data):
+                        if item.get('file_path') == file_path:
+                            self.filtered_yaml_data[i] = yaml_data
+                            break
                 for i, item in enumerate(self.yaml_data):
                     if item.get('file_path') == file_path:
                         self.yaml_data[i] = yaml_data
                         break
+                if rid is not None:
+                    self.poc_index.update(rid, yaml_data, content)
+            self.onResultSetChanged()
+            self.applyOrdering()
 
             self.updateTable()
-            self.updatePageInfo()
+            self.restoreSelection(selected_row, file_path)
             self.total_files_label.setText(f"POC总数: {len(self.yaml_data)}")
             QMessageBox.information(self, "成功", f"文件已保存: {file_name}")
 
         except Exception as e:
             QMessageBox.critical(self, "错误", f"保存文件失败: {str(e)}")
 
+    def onEditorIssuesChanged(self, issues):
+        if issues:
+            more = f"（共 {len(issues)} 个问题）" if len(issues) > 1 else ""
+            self.statusBar().showMessage(f"模板校验: 第 {issues[0].line + 1} 行 {issues[0].message}{more}")
+        elif self.statusBar().currentMessage().startswith("模板校验"):
+            self.statusBar().clearMessage()
+
     def runNuclei(self):
         try:
             # 验证运行前提条件
@@ -1487,13 +5730,13 @@ class NucleiPOCManager(QMainWindow):
             temp_file_path = self.save_targets_file(targets)
 
             # 检查是否有行被选中
-            selected_row = self.tableWidget.currentRow()
+            selected_row = self.tableView.currentIndex().row()
             if selected_row < 0:
                 QMessageBox.warning(self, "���误", "请选择要运行的POC")
                 return
 
             # 获取当前选中的文件路径
-            file_name = self.tableWidget.item(selected_row, 1).text()  # 假定文件名在二列
+            file_name = self.recordAtRow(selected_row).get('original_filename')
             file_path = os.path.join(self.yaml_folder_path, file_name)
 
             # 检查模板文件是否存在
@@ -1563,7 +5806,13 @@ class NucleiPOCManager(QMainWindow):
             temp_file_path = self.save_targets_file(targets)
 
             # 从过滤后的数据中收集所有 YAML 文件名
-            file_names = [item['original_filename'] for item in self.filtered_yaml_data]
+            if self.sqlite_store:
+                file_names = self.sqlite_store.relativePaths(self.yaml_folder_path, self.sqlite_query)
+            elif self.column_filter_bits is not None:
+                # 使用了表头筛选时，批量运行表格中显示的模板
+                file_names = [self.poc_index.get(rid)['original_filename'] for rid in self.displayedRids()]
+            else:
+                file_names = [item['original_filename'] for item in self.filtered_yaml_data]
 
             # 如果没有找到文件，显示警告
             if not file_names:
@@ -1609,7 +5858,19 @@ class NucleiPOCManager(QMainWindow):
             QMessageBox.critical(self, "错误", f"批量运行Nuclei时发生错误: {str(e)}")
 
     def closeEvent(self, event):
-        """在关闭窗口时清理临时文件"""
+        """在关闭窗口时保存会话并清理临时文件"""
+        self.saveSession()
+        self.cancelRegexSearch()
+        self.regex_workers.close()
+        self.cancelPrefetch()
+        self.editor_widget.stopValidation()
+        if self.validate_thread is not None:
+            self.validate_thread.wait()
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.cancel()
+            self.export_thread.wait()
+        for thread in list(self.retired_threads):
+            thread.wait(2000)
         self.cleanup_temp_dirs()
         event.accept()  # 允许关闭事件
 
@@ -1637,13 +5898,13 @@ class NucleiPOCManager(QMainWindow):
             temp_file_path = self.save_targets_file(targets)
 
             # 检查是否有行被选中
-            selected_row = self.tableWidget.currentRow()
+            selected_row = self.tableView.currentIndex().row()
             if selected_row < 0:
                 QMessageBox.warning(self, "错误", "请选择要调试的POC")
                 return
 
             # 获取当前选中的文件路径
-            file_name = self.tableWidget.item(selected_row, 1).text()
+            file_name = self.recordAtRow(selected_row).get('original_filename')
             file_path = os.path.join(self.yaml_folder_path, file_name)
 
             # 检查模板文件是否存在
@@ -1698,7 +5959,150 @@ def executeNucleiCommand(self, template_args):
             os.remove(temp_targets)
 
 
+def benchTableRender(count=100000, pages=200):
+    """表格翻页绘制的微基准：随机跳到 pages 个位置，分别统计整页绘制与 data() 的耗时
+
+    对比按需计算展示值（display=None，SQLite 模式的路径）与使用 RowDisplayCache 的耗时。
+    """
+    import random
+    from PyQt5.QtGui import QPixmap
+    random.seed(0)
+    severities = list(PocTableModel.SEVERITY_LABELS)
+    records = [{'file_path': f'/bench/{i}.yaml', 'original_filename': f'http/cves/{2000 + i % 25}/CVE-{i}.yaml',
+                'id': f'bench-{i}',
+                'info': {'severity': severities[i % len(severities)], 'author': ['a', 'b'],
+                         'tags': ['cve', f't{i % 300}', 'rce'], 'description': 'description ' * 8,
+                         'reference': [f'https://example.com/{i}'],
+                         'classification': {'cve-id': f'CVE-2020-{i}'}}} for i in range(count)]
+    index = PocIndex()
+    cache = RowDisplayCache()
+    index.observers.append(cache)
+    index.rebuild(records)
+    rids = list(index.records)
+    random.shuffle(rids)
+
+    model = PocTableModel()
+    view = QTableView()
+    view.setModel(model)
+    view.setItemDelegate(SelectedRowDelegate(view))
+    view.resize(1200, 800)
+    view.show()
+    pixmap = QPixmap(view.viewport().size())
+    page_rows = max(1, view.viewport().height() // view.verticalHeader().defaultSectionSize())
+
+    def run(label, display):
+        model.setRows(len(rids), lambda row: index.records[rids[row]], display)
+        QApplication.processEvents()
+        positions = [random.randrange(len(rids) - page_rows) for _ in range(pages)]
+        paint_times = []
+        for position in positions:
+            view.verticalScrollBar().setValue(position)
+            started = time.perf_counter()
+            view.viewport().render(pixmap)
+            paint_times.append(time.perf_counter() - started)
+        paint_times.sort()
+        model.row_cache.clear()
+        started = time.perf_counter()
+        for position in positions:
+            for row in range(position, position + page_rows):
+                for column in range(len(model.HEADERS)):
+                    model.data(model.index(row, column))
+                model.data(model.index(row, 2), Qt.ForegroundRole)
+        data_time = (time.perf_counter() - started) / pages
+        print(f"{label}: 整页绘制 中位数 {paint_times[len(paint_times) // 2] * 1000:.2f} ms, "
+              f"P90 {paint_times[int(len(paint_times) * 0.9)] * 1000:.2f} ms; "
+              f"每页 {page_rows} 行 data() {data_time * 1000:.3f} ms")
+
+    print(f"{count} 条记录, {pages} 次随机翻页")
+    run("按需计算", None)
+    run("展示元组缓存", lambda row: cache.values[rids[row]])
+
+
+def benchTemplateText(lines):
+    """基准测试用的模板文本：重复一个带原始请求的典型模板直到 lines 行"""
+    template = [
+        "id: CVE-2023-12345",
+        "info:",
+        "  name: Example Remote Code Execution",
+        "  author: alice,bob",
+        "  severity: critical",
+        "  description: Example description with https://example.com/advisory # trailing comment",
+        "  reference:",
+        "    - https://nvd.nist.gov/vuln/detail/CVE-2023-12345",
+        "  tags: cve,cve2023,rce,oast",
+        "http:",
+        "  - raw:",
+        "      - |",
+        "        POST /api/v1/upload?name={{randstr}} HTTP/1.1",
+        "        Host: {{Hostname}}",
+        "        Content-Type: application/x-www-form-urlencoded",
+        "",
+        "        payload=aGVsbG8gd29ybGQ%3D&debug=true&mode=high",
+        "    matchers-condition: and",
+        "    matchers:",
+        "      - type: word",
+        "        part: body",
+        "        words:",
+        "          - \"uid=\"",
+        "      - type: status",
+        "        status:",
+        "          - 200",
+        "    extractors:",
+        "      - type: regex",
+        "        regex:",
+        "          - 'token=([a-z0-9]+)'",
+        "# generated by nuclei-templates",
+    ]
+    return '\n'.join(template[i % len(template)] for i in range(lines))
+
+
+def benchHighlighter(lines=10000, repeat=3):
+    """语法高亮的微基准：对 lines 行的模板文档整体重新高亮 repeat 次，取最快一次"""
+    from PyQt5.QtGui import QTextDocument
+    document = QTextDocument()
+    document.setPlainText(benchTemplateText(lines))
+    highlighter = NucleiPOCHighlighter(document)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        highlighter.rehighlight()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"语法高亮: {lines} 行, 整体重新高亮 {best * 1000:.1f} ms, 每行 {best / lines * 1e6:.1f} µs")
+
+
+def benchEditorPaint(sizes=(1000, 10000, 100000), repeat=50):
+    """编辑器重绘的微基准：不同行数的文档滚动到中间，统计正文（含缩进线）与行号区域各重绘一次的耗时"""
+    editor = YamlTextEdit()
+    editor.resize(900, 700)
+    editor.show()
+    for lines in sizes:
+        editor.setPlainText(benchTemplateText(lines))
+        editor.verticalScrollBar().setValue(editor.verticalScrollBar().maximum() // 2)
+        QApplication.processEvents()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            editor.viewport().repaint()
+            editor.line_number_area.repaint()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"编辑器重绘: {lines} 行, 中位数 {timings[len(timings) // 2] * 1000:.2f} ms")
+
+
 def main():
+    if '--bench' in sys.argv:
+        # --bench [table|highlight|paint]，不指定时运行全部基准
+        app = QApplication(sys.argv)
+        position = sys.argv.index('--bench')
+        target = sys.argv[position + 1] if position + 1 < len(sys.argv) else 'all'
+        if target in ('all', 'table'):
+            benchTableRender()
+        if target in ('all', 'highlight'):
+            benchHighlighter()
+        if target in ('all', 'paint'):
+            benchEditorPaint()
+        return
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     font = QFont("Microsoft YaHei", 9)